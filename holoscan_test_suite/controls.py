@@ -23,13 +23,140 @@
 # always see synchonized state.
 
 
-import flask_socketio
+import codecs
 from . import html_render
 import os
+import string
 import subprocess
+import time
 import traceback
 
 
+# Include this guy in the page (after html_render.socket_io_js and the
+# "var socket = io()" line) to pull in the shared client-side dispatch
+# for all the Controls on the page.  Each control registers itself in
+# the "controls" map; these handlers then route server messages via
+# event.control, so the page has one set of socket.on handlers no
+# matter how many controls it shows.
+bootstrap_js = html_render.javascript(
+    """
+    var controls = {};
+    // Request the initial value of every control from the server.
+    socket.on("connect", (event) => {
+        for (const name in controls) {
+            console.log("Requesting status: " + name);
+            socket.emit("request", {control: name});
+        }
+    });
+    // When the websocket closes, gray everything out.
+    socket.on("disconnect", (event) => {
+        for (const name in controls) {
+            const control = controls[name];
+            if (control.onDisconnect) {
+                control.onDisconnect();
+            }
+        }
+    });
+    socket.on("value", (event) => {
+        const control = controls[event.control];
+        if (control && control.onValue) {
+            control.onValue(event);
+        }
+    });
+    // Periodic status arrives as one frame carrying every control's
+    // value; fan it out to the same per-control handlers.
+    socket.on("status-batch", (event) => {
+        for (const name in event) {
+            const control = controls[name];
+            if (control && control.onValue) {
+                control.onValue({control: name, enable: true, ...event[name]});
+            }
+        }
+    });
+    socket.on("stdout", (event) => {
+        const control = controls[event.control];
+        if (control && control.onStdout) {
+            control.onStdout(event);
+        }
+    });
+    socket.on("stderr", (event) => {
+        const control = controls[event.control];
+        if (control && control.onStderr) {
+            control.onStderr(event);
+        }
+    });
+    socket.on("reset", (event) => {
+        const control = controls[event.control];
+        if (control && control.onReset) {
+            control.onReset(event);
+        }
+    });
+"""
+)
+
+
+# The per-control registration scripts, parsed once at import.  These
+# are string.Templates (not f-strings) so the JS braces don't need
+# doubling and the substitution cost is one pass over the template.
+_checkbox_js = string.Template(
+    """
+                controls["$name"] = {
+                    element: document.getElementById("$name"),
+                    stdout: document.getElementById("${name}_stdout"),
+                    stderr: document.getElementById("${name}_stderr"),
+                    output: document.getElementById("${name}_output"),
+                    // Handle updates (incl the initial value) from the server;
+                    // update the control per the value and enable the control.
+                    onValue(event) {
+                        this.element.checked = event.value;
+                        this.element.disabled = !event.enable;
+                    },
+                    // When the websocket closes, gray this thing out.
+                    onDisconnect() {
+                        this.element.disabled = true;
+                    },
+                    // add to stdout
+                    onStdout(event) {
+                        this.stdout.append(event.value);
+                        this.output.hidden = false;
+                    },
+                    // add to stderr
+                    onStderr(event) {
+                        this.stderr.append(event.value);
+                        this.output.hidden = false;
+                    },
+                    // clear both stdout and stderr
+                    onReset(event) {
+                        this.stdout.innerHTML = "";
+                        this.stderr.innerHTML = "";
+                        this.output.hidden = true;
+                    },
+                };
+                // When the user clicks this thing, send the new value to the server.
+                controls["$name"].element.onclick = function() {
+                    socket.emit("update", {value: this.checked, control: "$name"});
+                };
+            """
+)
+
+_status_js = string.Template(
+    """
+                    controls["$name"] = {
+                        element: document.getElementById("$name"),
+                        // Handle updates (incl the initial value) from the server.
+                        onValue(event) {
+                            this.element.innerHTML = event.value;
+                            this.element.disabled = false;
+                        },
+                        // When the websocket closes, gray this thing out.
+                        onDisconnect() {
+                            this.element.disabled = true;
+                        },
+                    };
+                """
+)
+
+
 class Runner:
     """
     Runner manages a subprocess that is invoked by the UI, providing a way
@@ -39,11 +166,18 @@ class Runner:
     and stdout to be displayed as expected.
     """
 
-    def __init__(self, reactor, app, command, env_update={}, cwd=None):
-        self._app = app
+    def __init__(
+        self, reactor, socketio, command, env_update=None, cwd=None, executable=None
+    ):
+        self._socketio = socketio
         self._command = command
+        # The already-resolved absolute path of command[0], when the
+        # caller looked it up; saves exec a PATH walk on every start.
+        self._executable = executable
         self._process = None
-        self._env_update = env_update
+        # Merge the subprocess environment once here, rather than
+        # copying all of os.environ on every start.
+        self._env = {**os.environ, **(env_update or {})}
         self._cwd = cwd
         self._reactor = reactor
 
@@ -54,38 +188,54 @@ class Runner:
         """
         self._control = control
         self._control_name = control._control_name
+        # The reset message never changes; build it once.  (The event
+        # names themselves are constants--"reset"/"stdout"/"stderr"--
+        # since the shared-dispatch change, so there's no per-message
+        # name formatting left on the hot path.)
+        self._reset_message = {"control": self._control_name}
 
     def start(self):
         if self._process is None:
             # Clear the stdout/stderr displayed on the page
-            with self._app.test_request_context("/"):
-                flask_socketio.emit(
-                    "%s-reset" % self._control_name,
-                    {"control": self._control_name},
-                    broadcast=True,
-                    namespace="/",
-                )
+            self._socketio.emit(
+                "reset",
+                self._reset_message,
+                namespace="/",
+            )
             self._start()
         else:
             print('Already started "%s" -- ignoring' % (self._command,))
 
     def _start(self):
         print('Starting "%s"' % (self._command,))
-        env = {}
-        env.update(os.environ)  # make a copy of the current environment
-        env.update(self._env_update)  # update it according to our prefs
-        self._stdout_r, self._stdout_w = os.pipe()
-        self._stderr_r, self._stderr_w = os.pipe()
+        # O_CLOEXEC so the fds don't leak into the subprocess we're
+        # about to start (subprocess makes the ends we actually hand
+        # it inheritable itself).  Only the read ends go non-blocking--
+        # the write ends share their file description with the child's
+        # stdout/stderr, which must stay blocking.  Non-blocking reads
+        # let our handlers drain everything that's currently buffered
+        # in one reactor wakeup (and therefore publish it in a single
+        # emit).
+        self._stdout_r, self._stdout_w = os.pipe2(os.O_CLOEXEC)
+        self._stderr_r, self._stderr_w = os.pipe2(os.O_CLOEXEC)
+        # Incremental decoders carry partial multibyte sequences over
+        # to the next read, so a UTF-8 character split across two
+        # chunks doesn't raise (and any actually invalid byte is
+        # replaced instead of killing the handler).
+        self._stdout_decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._stderr_decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        os.set_blocking(self._stdout_r, False)
+        os.set_blocking(self._stderr_r, False)
         self._reactor.register(self._stdout_r, self.stdout)
         self._reactor.register(self._stderr_r, self.stderr)
         try:
             self._process = subprocess.Popen(
                 args=self._command,
-                env=env,
+                executable=self._executable,
+                env=self._env,
                 stdout=self._stdout_w,
                 stderr=self._stderr_w,
                 cwd=self._cwd,
-                bufsize=0,
             )
         except Exception as e:
             s = traceback.format_exception(e)
@@ -108,16 +258,38 @@ class Runner:
         self._process = None
         print('Stopping "%s"' % (self._command,))
         process.terminate()
-        timeout_s = 20
-        process.communicate(timeout=timeout_s)
         if self._stdout_w != -1:
             os.close(self._stdout_w)
             self._stdout_w = -1
         if self._stderr_w != -1:
             os.close(self._stderr_w)
             self._stderr_w = -1
+        # Don't wait for the process here--that used to block the
+        # calling thread (often the reactor itself) for up to 20s
+        # while communicate() drained the child.  The registered pipe
+        # handlers keep draining stdout/stderr as usual; we just check
+        # in on the process periodically and escalate to SIGKILL if it
+        # ignores SIGTERM past the deadline.
+        timeout_s = 20
+        self._reap(process, time.monotonic() + timeout_s)
         self._control.stopped()
 
+    def _reap(self, process, kill_deadline):
+        """Poll (rescheduling ourselves via a reactor alarm, so nothing
+        blocks) until the process we terminated actually exits; SIGKILL
+        it if it's still running at the deadline.
+        """
+        if process.poll() is not None:
+            print('"%s" exited with %s' % (self._command, process.returncode))
+            return
+        now = time.monotonic()
+        if now >= kill_deadline:
+            print('Killing unresponsive "%s"' % (self._command,))
+            process.kill()
+            # Only kill once; the next poll() will reap it.
+            kill_deadline = float("inf")
+        self._reactor.alarm(now + 1, lambda: self._reap(process, kill_deadline))
+
     def update(self, state):
         if state:
             self.start()
@@ -125,39 +297,57 @@ class Runner:
             self.stop()
         return self._process is not None
 
+    def _drain(self, fd):
+        """Read everything currently buffered in the given non-blocking
+        file descriptor.  Returns (data, closed), where closed is True
+        if we saw EOF (meaning the subprocess is done with the pipe).
+        """
+        chunks = []
+        closed = False
+        while True:
+            try:
+                chunk = os.read(fd, 65536)
+            except BlockingIOError:
+                break
+            if len(chunk) == 0:
+                closed = True
+                break
+            chunks.append(chunk)
+        return b"".join(chunks), closed
+
     def stderr(self, event):
-        value = os.read(self._stderr_r, 8192).decode()
-        if len(value) == 0:
+        data, closed = self._drain(self._stderr_r)
+        value = self._stderr_decoder.decode(data, closed)
+        if len(value):
+            # One emit for everything we drained, instead of
+            # one emit per 8K chunk.
+            self._socketio.emit(
+                "stderr",
+                {"control": self._control_name, "value": value},
+                namespace="/",
+            )
+        if closed:
             print("stderr closed.")
             self._reactor.unregister(self._stderr_r)
             os.close(self._stderr_r)
             if self._process is not None:
                 self.stop()
-            return
-        with self._app.test_request_context("/"):
-            flask_socketio.emit(
-                "%s-stderr" % self._control_name,
+
+    def stdout(self, event):
+        data, closed = self._drain(self._stdout_r)
+        value = self._stdout_decoder.decode(data, closed)
+        if len(value):
+            self._socketio.emit(
+                "stdout",
                 {"control": self._control_name, "value": value},
-                broadcast=True,
                 namespace="/",
             )
-
-    def stdout(self, event):
-        value = os.read(self._stdout_r, 8192).decode()
-        if len(value) == 0:
+        if closed:
             print("stdout closed.")
             self._reactor.unregister(self._stdout_r)
             os.close(self._stdout_r)
             if self._process is not None:
                 self.stop()
-            return
-        with self._app.test_request_context("/"):
-            flask_socketio.emit(
-                "%s-stdout" % self._control_name,
-                {"control": self._control_name, "value": value},
-                broadcast=True,
-                namespace="/",
-            )
 
 
 class Control:
@@ -169,8 +359,10 @@ class Control:
     - stopped: runner calls this when the process terminates
     """
 
-    def __init__(self, app, label, control_name):
-        self._app = app
+    __slots__ = ("_socketio", "_label", "_control_name")
+
+    def __init__(self, socketio, label, control_name):
+        self._socketio = socketio
         self._label = label
         self._control_name = control_name
 
@@ -230,12 +422,15 @@ class Checkbox(Control):
     and the value is "True" or "False"
     """
 
+    __slots__ = ("_value", "_update", "_rendered")
+
     def __init__(
-        self, app, label, control_name, value=False, update=lambda value: value
+        self, socketio, label, control_name, value=False, update=lambda value: value
     ):
-        super(Checkbox, self).__init__(app, label, control_name)
+        super(Checkbox, self).__init__(socketio, label, control_name)
         self._value = value
         self._update = update
+        self._rendered = None
 
     def render(self, r):
         """
@@ -243,9 +438,15 @@ class Checkbox(Control):
         the Checkbox control and Javascript support code to keep
         the value shown in the browser up to date.
 
+        The generated HTML only depends on _label and _control_name,
+        which never change after construction-- so we render the
+        tree to a single string the first time through and just
+        reuse that string on later calls.
         """
-        r.append(
-            [
+        if self._rendered is not None:
+            r.append(self._rendered)
+            return
+        tree = [
                 # Render the input element itself in a disabled (grayed out) mode;
                 # we'll enable it when we get the current value from the server via js.
                 html_render.checkbox(
@@ -280,60 +481,15 @@ class Checkbox(Control):
                     ],
                     attributes={"id": f"{self._control_name}_output", "hidden": None},
                 ),
-                # Javascript support
+                # Javascript support: register this control with the
+                # shared dispatch (see bootstrap_js above), which routes
+                # server messages here via event.control.
                 html_render.javascript(
-                    f"""
-                // Make js variables that point to the checkbox and it's stdout/stderr fields.
-                const {self._control_name} = document.getElementById("{self._control_name}");
-                const {self._control_name}_stdout = document.getElementById("{self._control_name}_stdout");
-                const {self._control_name}_stderr = document.getElementById("{self._control_name}_stderr");
-                const {self._control_name}_output = document.getElementById("{self._control_name}_output");
-                // Request the initial value from the server.
-                socket.on("connect", (event) => {{
-                    console.log("Requesting status: {self._control_name}");
-                    socket.emit("request", {{control: "{self._control_name}"}});
-                }});
-                // Handle updates (incl the initial value) from the server;
-                // update the control per the value and enable the control.
-                socket.on("{self._control_name}-value", (event) => {{
-                    value = event.value;
-                    console.log("Value received, {self._control_name}=" + value);
-                    {self._control_name}.checked = value;
-                    {self._control_name}.disabled = !event.enable;
-                }});
-                // When the user clicks this thing, send the new value to the server.
-                {self._control_name}.onclick = function() {{
-                    socket.emit("update", {{value: this.checked, control: "{self._control_name}"}});
-                }};
-                // When the websocket closes, gray this thing out.
-                socket.on("disconnect", (event) => {{
-                    console.log("Closing {self._control_name}");
-                    {self._control_name}.disabled = true;
-                }});
-                // add to stdout
-                socket.on("{self._control_name}-stdout", (event) => {{
-                    value = event.value;
-                    console.log("stdout received, {self._control_name}=" + value);
-                    {self._control_name}_stdout.append(value);
-                    {self._control_name}_output.hidden = false;
-                }});
-                // add to stderr
-                socket.on("{self._control_name}-stderr", (event) => {{
-                    value = event.value;
-                    console.log("stderr received, {self._control_name}=" + value);
-                    {self._control_name}_stderr.append(value);
-                    {self._control_name}_output.hidden = false;
-                }});
-                // clear both stdout and stderr
-                socket.on("{self._control_name}-reset", (event) => {{
-                    {self._control_name}_stdout.innerHTML = "";
-                    {self._control_name}_stderr.innerHTML = "";
-                    {self._control_name}_output.hidden = true;
-                }});
-            """
+                    _checkbox_js.substitute(name=self._control_name)
                 ),
-            ]
-        )
+        ]
+        self._rendered = html_render.render(tree)
+        r.append(self._rendered)
 
     def update(self, control_name, value):
         r = self._update(value)
@@ -353,13 +509,11 @@ class Checkbox(Control):
 
     def stopped(self):
         reply = self.update(self._control_name, False)
-        with self._app.test_request_context("/"):
-            flask_socketio.emit(
-                "%s-value" % self._control_name,
-                reply,
-                broadcast=True,
-                namespace="/",
-            )
+        self._socketio.emit(
+            "value",
+            reply,
+            namespace="/",
+        )
 
 
 class Status(Control):
@@ -373,47 +527,35 @@ class Status(Control):
 
     """
 
-    def __init__(self, app, label, control_name):
-        super(Status, self).__init__(app, label, control_name)
+    __slots__ = ("_rendered",)
+
+    def __init__(self, socketio, label, control_name):
+        super(Status, self).__init__(socketio, label, control_name)
+        self._rendered = None
 
     def render(self, r):
+        # Same invariant as Checkbox.render: the tree only depends
+        # on immutable fields, so render it once and reuse the string.
+        if self._rendered is not None:
+            r.append(self._rendered)
+            return
         attributes = {
             "id": self._control_name,
             "disabled": None,
         }
-        r.append(
-            [
+        tree = [
                 self._label,
                 [
                     html_render.pre(html_render.div("", attributes=attributes)),
-                    # Javascript support
+                    # Javascript support: register with the shared
+                    # dispatch (see bootstrap_js above).
                     html_render.javascript(
-                        f"""
-                    // Make a js variable that points to the checkbox.
-                    const {self._control_name} = document.getElementById("{self._control_name}");
-                    // Request the initial value from the server.
-                    socket.on("connect", (event) => {{
-                        console.log("Requesting status: {self._control_name}");
-                        socket.emit("request", {{control: "{self._control_name}"}});
-                    }});
-                    // Handle updates (incl the initial value) from the server;
-                    // update the control per the value and enable the control.
-                    socket.on("{self._control_name}-value", (event) => {{
-                        value = event.value;
-                        console.log("Value received, {self._control_name}=" + value);
-                        {self._control_name}.innerHTML = value;
-                        {self._control_name}.disabled = false;
-                    }});
-                    // When the websocket closes, gray this thing out.
-                    socket.on("disconnect", (event) => {{
-                        console.log("Closing {self._control_name}");
-                        {self._control_name}.disabled = true;
-                    }});
-                """
+                        _status_js.substitute(name=self._control_name)
                     ),
                 ],
-            ]
-        )
+        ]
+        self._rendered = html_render.render(tree)
+        r.append(self._rendered)
 
     def publish(self, value):
         reply = {
@@ -421,13 +563,11 @@ class Status(Control):
             "enable": True,
         }
         reply.update(value)
-        with self._app.test_request_context("/"):
-            flask_socketio.emit(
-                "%s-value" % self._control_name,
-                reply,
-                broadcast=True,
-                namespace="/",
-            )
+        self._socketio.emit(
+            "value",
+            reply,
+            namespace="/",
+        )
 
     def stopped(self):
         pass
@@ -54,42 +54,66 @@
 # an already-flattened list.
 #
 
+import collections
+import functools
 from html import escape
+import io
 import yaml
 
 
 #
 # HTML Support
 #
+
+# escape() has to scan every character; attribute values (ids, control
+# names, rowspan counts) repeat constantly across a page, so a bounded
+# memo turns most of those scans into a dict hit.
+_escape = functools.lru_cache(maxsize=4096)(escape)
+
+
+def _flatten_into(write, tree):
+    """Walk the tree depth-first, calling write() with each leaf (as a
+    string).  The traversal is iterative (an explicit work stack) so
+    that deeply nested documents don't recurse once per level.
+    """
+    stack = collections.deque()
+    stack.append(tree)
+    while stack:
+        element = stack.pop()
+        if hasattr(element, "html"):
+            stack.append(element.html())
+        elif isinstance(element, list):
+            # reversed, so that pop() sees the elements in order.
+            stack.extend(reversed(element))
+        else:
+            write(str(element))
+
+
 def flatten(r, tree):
     """Given a tree, append to list r the elements in a depth-first traversal.
     Application code doesn't normally call this method; just use render.
     """
-    for element in tree:
-        if hasattr(element, "html"):
-            v = element.html()
-            flatten(r, v)
-            continue
-        if isinstance(element, list):
-            flatten(r, element)
-        else:
-            r.append(str(element))
+    _flatten_into(r.append, tree)
     return r
 
 
 def render(tree):
     """Flatten the given tree then return it, joined together into a single
-    string.
+    string.  The pieces are streamed into a string buffer, so we never
+    hold both the flattened list and the joined result at the same time.
     """
-    out = "".join(flatten([], tree))
-    return out
+    buf = io.StringIO()
+    _flatten_into(buf.write, tree)
+    return buf.getvalue()
 
 
 def tag(tag_name, style=None, attributes=None):
-    """Return content for "<tag attribute(s)... style=style(s)...>"
+    """Return a single string "<tag attribute(s)... style=style(s)...>"
     with the given elements from the maps for style or attributes.
     style or attributes can be None or {}, in which case
-    the relevant section is omitted.
+    the relevant section is omitted.  Returning one string (instead
+    of a list of fragments) keeps flatten from walking several
+    elements per tag.
     """
     r = ["<", tag_name]
     if (attributes is not None) and len(attributes):
@@ -97,13 +121,19 @@ def tag(tag_name, style=None, attributes=None):
             if v is None:
                 r.append(" %s" % k)
             else:
-                r.append(' %s="%s"' % (k, escape(v)))
-    if (style is not None) and len(style):
+                r.append(' %s="%s"' % (k, _escape(v)))
+    if style is default_col_style:
+        # Identity fast path: a big table uses this exact dict once per
+        # cell, so don't re-join the same style string every time.
+        r.append(_default_col_style_string)
+    elif style is default_table_style:
+        r.append(_default_table_style_string)
+    elif (style is not None) and len(style):
         r.append(' style="')
         r.append(";".join("%s:%s" % (k, v) for k, v in style.items()))
         r.append('"')
     r.append(">")
-    return r
+    return "".join(r)
 
 
 def link(content, url, style=None, attributes=None):
@@ -150,7 +180,7 @@ def html(content, attributes=default_html_attributes):
     return [html_start(attributes), content, html_end()]
 
 
-def body_start(attributes={}):
+def body_start(attributes=None):
     return [tag("body", attributes=attributes)]
 
 
@@ -158,14 +188,18 @@ def body_end():
     return ["</body>"]
 
 
-def body(content, attributes={}):
+def body(content, attributes=None):
     return [body_start(attributes), content, body_end()]
 
 
 def ul(items):
+    # Emit a flat list (rather than one sublist per item) so flatten
+    # has fewer nodes to walk.
     r = ["<ul>"]
     for i in items:
-        r.append(["<li>", i, "</li>"])
+        r.append("<li>")
+        r.append(i)
+        r.append("</li>")
     r.append("</ul>")
     return r
 
@@ -188,14 +222,31 @@ default_table_style = {
 }
 
 
+def _style_string(style):
+    return ' style="%s"' % (";".join("%s:%s" % (k, v) for k, v in style.items()),)
+
+
+# Formatted once at import; tag() uses these when it's given the
+# default style dicts themselves.
+_default_col_style_string = _style_string(default_col_style)
+_default_table_style_string = _style_string(default_table_style)
+
+
 def table(
     rows, style=default_table_style, col_style=default_col_style, attributes=None
 ):
-    r = []
+    # As in ul, build one flat list for the whole table instead of a
+    # sublist per row and per cell.
+    r = [tag("table", style=style, attributes=attributes)]
     for cols in rows:
-        this_row = [[tag("td", col_style), c, "</td>"] for c in cols]
-        r.append([tag("tr"), this_row, "</tr>"])
-    return [tag("table", style=style, attributes=attributes), r, "</table>"]
+        r.append("<tr>")
+        for c in cols:
+            r.append(tag("td", col_style))
+            r.append(c)
+            r.append("</td>")
+        r.append("</tr>")
+    r.append("</table>")
+    return r
 
 
 def div(content, style=None, attributes=None):
@@ -206,17 +257,27 @@ def script(content, style=None, attributes=None):
     return [tag("script", style=style, attributes=attributes), content, "</script>"]
 
 
-def javascript(content, style=None, attributes={}):
-    u = {"type": "text/javascript", "charset": "utf-8"}
-    u.update(attributes)
+_javascript_attributes = {"type": "text/javascript", "charset": "utf-8"}
+
+
+def javascript(content, style=None, attributes=None):
+    u = _javascript_attributes
+    if attributes:
+        u = dict(u)
+        u.update(attributes)
     return script(content, style, u)
 
 
-def checkbox(content, style=None, attributes={}):
-    t = {
-        "type": "checkbox",
-    }
-    t.update(attributes)
+_checkbox_attributes = {
+    "type": "checkbox",
+}
+
+
+def checkbox(content, style=None, attributes=None):
+    t = _checkbox_attributes
+    if attributes:
+        t = dict(t)
+        t.update(attributes)
     return [
         tag("label"),
         tag("input", style=style, attributes=t),
@@ -225,10 +286,9 @@ def checkbox(content, style=None, attributes={}):
     ]
 
 
-def _option(value, content, attributes={}):
-    n = {}
-    n.update(attributes)
-    n.update({"value": value})
+def _option(value, content, attributes=None):
+    n = dict(attributes) if attributes else {}
+    n["value"] = value
     return [
         tag("option", attributes=n),
         content,
@@ -236,7 +296,7 @@ def _option(value, content, attributes={}):
     ]
 
 
-def select(name, options, style=None, attributes={}):
+def select(name, options, style=None, attributes=None):
     options = [_option(value, content) for value, content in options.items()]
     return [
         tag("select", style=style, attributes=attributes),
@@ -255,25 +315,29 @@ def _rtable(m):
     columns (with appropriate rowspans) to serve as headers as appropriate.
     """
     rows = []
+
+    def add_spanned(ir, label):
+        # Prefix the first inner row with a rowspan'd header cell, then
+        # take the rest of the inner rows as-is.  Iterating (rather
+        # than slicing ir[1:]) avoids copying the inner row list again.
+        if not len(ir):
+            return
+        inner = iter(ir)
+        h = tag("td", default_col_style, attributes={"rowspan": "%d" % len(ir)})
+        rows.append([h, label, "</td>", next(inner)])
+        rows.extend(inner)
+
     for name, value in m.items():
         if isinstance(value, dict):
-            ir = _rtable(value)
-            if len(ir):
-                h = tag("td", default_col_style, attributes={"rowspan": "%d" % len(ir)})
-                this_row = [h, name, "</td>", ir[0]]
-                rows.append(this_row)
-                rows.extend(ir[1:])
-            continue
+            add_spanned(_rtable(value), name)
         elif isinstance(value, list):
             for n, v in enumerate(value):
-                ir = _rtable(v)
-                h = tag("td", default_col_style, attributes={"rowspan": "%d" % len(ir)})
-                this_row = [h, "%s %s" % (name, n), "</td>", ir[0]]
-                rows.append(this_row)
-                rows.extend(ir[1:])
-            continue
-        this_row = [[tag("td", default_col_style), c, "</td>"] for c in (name, value)]
-        rows.append(this_row)
+                add_spanned(_rtable(v), "%s %s" % (name, n))
+        else:
+            this_row = [
+                [tag("td", default_col_style), c, "</td>"] for c in (name, value)
+            ]
+            rows.append(this_row)
     return rows
 
 
@@ -318,7 +382,20 @@ def na(context, style=None):
     )
 
 
+def add_yaml_representer(cls, representer):
+    """Register a YAML representer with the default pure-Python dumper
+    and, when PyYAML was built with libyaml, with CSafeDumper as well,
+    so report code can use the (much faster) C emitter."""
+    yaml.add_representer(cls, representer)
+    if hasattr(yaml, "CSafeDumper"):
+        yaml.add_representer(cls, representer, Dumper=yaml.CSafeDumper)
+
+
 class Div:
+    # Reports allocate a lot of these; __slots__ drops the per-instance
+    # __dict__.
+    __slots__ = ("_content", "_style", "_attributes")
+
     def __init__(self, content=[], style=None, attributes=None):
         self._content = content
         self._style = style
@@ -334,10 +411,12 @@ class Div:
         return dumper.represent_data(self._content)
 
 
-yaml.add_representer(Div, lambda dumper, data: data.yaml(dumper))
+add_yaml_representer(Div, lambda dumper, data: data.yaml(dumper))
 
 
 class Link:
+    __slots__ = ("_content", "_url", "_style", "_attributes")
+
     def __init__(self, content, url, style=None, attributes=None):
         self._content = content
         self._url = url
@@ -356,7 +435,7 @@ class Link:
         return dumper.represent_data(self._content)
 
 
-yaml.add_representer(Link, lambda dumper, data: data.yaml(dumper))
+add_yaml_representer(Link, lambda dumper, data: data.yaml(dumper))
 
 # Include this guy in your doc to pull in websocket support.
 socket_io_js = script(
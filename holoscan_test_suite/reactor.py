@@ -20,18 +20,26 @@
 # events typically come from file descriptors that are ready to read.
 # Reactors also call handlers based on single-shot or periodic alarms.
 
-import collections
+import heapq
 import os
 import select
 import threading
 import time
 import traceback
 
-# Reactor has a list of alarms that are
-# instances of this.
-ReactorAlarm = collections.namedtuple(
-    "ReactorAlarm", ["deadline", "period_s", "callback"]
-)
+
+class ReactorAlarm:
+    """Reactor tracks its alarms with instances of this.  A mutable
+    slots class (rather than a namedtuple) so the periodic re-arm path
+    can advance the deadline in place instead of allocating a
+    replacement object on every tick."""
+
+    __slots__ = ("deadline", "period_s", "callback")
+
+    def __init__(self, deadline, period_s, callback):
+        self.deadline = deadline
+        self.period_s = period_s
+        self.callback = callback
 
 
 class Reactor:
@@ -74,17 +82,41 @@ class Reactor:
     call alarm().
     """
 
-    ALARM_UPDATE = b"ALARM_UPDATE"
-    DONE = b"DONE"
-
     def __init__(self):
-        self._alarms = []  # [ReactorAlarm, ...]; sorted earliest deadline first
+        # Min-heap of (deadline, seq, ReactorAlarm); heapq gives us
+        # O(log n) insert and pop-front instead of re-sorting the whole
+        # list on every registration.  seq is a tiebreaker so entries
+        # with equal deadlines never try to compare callbacks.
+        # (bisect.insort on a sorted list would also beat append+sort
+        # for registration, but the heap makes periodic re-arm O(log n)
+        # as well, so it wins on both paths.)
+        self._alarms = []
+        self._alarm_seq = 0
         self._alarms_lock = threading.Lock()
-        self._control_r, self._control_w = os.pipe()
+        # True while a wakeup is in flight on the wake fd; lets
+        # _signal skip redundant write syscalls when alarms are
+        # registered in a burst.  Guarded by _alarms_lock.
+        self._wake_pending = False
+        # An eventfd is a cheaper wake primitive than a pipe pair:
+        # one fd instead of two, no kernel pipe buffer, and a fixed
+        # 8-byte read clears any number of accumulated wakes.
+        # Non-blocking so _control_ready never stalls on a bare fd.
+        self._wake_fd = os.eventfd(0, os.EFD_NONBLOCK | os.EFD_CLOEXEC)
         self._epoll = select.epoll()
-        self._epoll_map = {}
+        # Dispatch table indexed by file descriptor.  fds are small
+        # dense integers, so a list (grown with None padding) turns the
+        # per-event lookup into a plain array load instead of a dict
+        # probe.
+        self._epoll_map = []
         self._done = False
-        self.register(self._control_r, self._control_ready)
+        # Edge-triggered: the wake fd only needs to bump the loop once
+        # per batch of signals, and _control_ready's read clears the
+        # counter, which re-arms the edge.
+        self.register(
+            self._wake_fd,
+            self._control_ready,
+            event=select.EPOLLIN | select.EPOLLET | select.EPOLLHUP,
+        )
 
     def start(self):
         self._thread = threading.Thread(
@@ -94,57 +126,85 @@ class Reactor:
         self._thread.start()
 
     def _run(self):
+        # Bind the hot-loop lookups once; the list object and the poll
+        # method never change, so this saves an attribute fetch per
+        # event dispatched.
+        poll = self._epoll.poll
+        epoll_map = self._epoll_map
+        wake_fd = self._wake_fd
         while not self._done:
             # Call all expired timeouts.
             timeout_s = None
+            # One clock sample covers the whole drain pass; it's only
+            # refreshed after a callback runs (callbacks can take
+            # arbitrary time), not per alarm inspected.
+            now = time.monotonic()
             while True:
                 with self._alarms_lock:
                     if len(self._alarms) < 1:
                         break
-                    # self._alarms is always sorted, earliest deadline first
-                    reactor_alarm = self._alarms[0]
-                    now = time.monotonic()
-                    if reactor_alarm.deadline > now:
-                        timeout_s = reactor_alarm.deadline - now
+                    # The heap keeps the earliest deadline at index 0.
+                    deadline, seq, reactor_alarm = self._alarms[0]
+                    if deadline > now:
+                        timeout_s = deadline - now
                         break
                     # So this deadline has been reached.
                     if reactor_alarm.period_s is None:
-                        self._alarms.pop(0)
+                        heapq.heappop(self._alarms)
                     else:
-                        # Update the deadline and reorder
-                        self._alarms[0] = ReactorAlarm(
-                            deadline=reactor_alarm.deadline + reactor_alarm.period_s,
-                            period_s=reactor_alarm.period_s,
-                            callback=reactor_alarm.callback,
+                        # Advance the deadline in place and reorder.
+                        # If a long handler blocked us past several
+                        # periods, skip the missed ones: fire once now
+                        # and land the next deadline in the future,
+                        # instead of burning a catch-up callback (and a
+                        # heap reorder) per missed period.
+                        period_s = reactor_alarm.period_s
+                        missed = int((now - deadline) // period_s) + 1
+                        reactor_alarm.deadline = deadline + missed * period_s
+                        heapq.heapreplace(
+                            self._alarms,
+                            (reactor_alarm.deadline, seq, reactor_alarm),
                         )
-                        self._alarms.sort()
                 # Now self._alarms isn't locked anymore.
                 try:
                     reactor_alarm.callback()
                 except Exception as e:
                     print("Ignoring %s (%s)" % (e, type(e)))
                     traceback.print_exception(e)
+                now = time.monotonic()
             # We've handled all our timeouts; timeout_s will
             # either be None (because the alarms list was empty)
             # or be the number of seconds until the next deadline.
-            events = self._epoll.poll(timeout=timeout_s)
+            events = poll(timeout=timeout_s)
+            control_event = None
             for fileno, event in events:
+                if fileno == wake_fd:
+                    # The wake fd carries no payload we act on here--
+                    # it only wakes the loop.  Defer clearing it until
+                    # real handlers have run, so their dispatch isn't
+                    # delayed by a housekeeping syscall.
+                    control_event = event
+                    continue
                 try:
-                    handler = self._epoll_map[fileno]
+                    handler = epoll_map[fileno]
                     handler(event)
                 except Exception as e:
                     print("Ignoring %s (%s)" % (e, type(e)))
                     traceback.print_exception(e)
+            if control_event is not None:
+                self._control_ready(control_event)
 
     def register(self, fd, handler, event=select.EPOLLIN | select.EPOLLHUP):
         """Set a callback on a ready filedescriptor."""
+        while len(self._epoll_map) <= fd:
+            self._epoll_map.append(None)
         self._epoll_map[fd] = handler
         self._epoll.register(fd, event)
 
     def unregister(self, fd):
         """Remove a previously registered handler."""
         self._epoll.unregister(fd)
-        del self._epoll_map[fd]
+        self._epoll_map[fd] = None
 
     def alarm(self, deadline, callback):
         """Queue up a callback to execute once the
@@ -152,39 +212,70 @@ class Reactor:
         """
         reactor_alarm = ReactorAlarm(deadline, None, callback)
         with self._alarms_lock:
-            self._alarms.append(reactor_alarm)
-            self._alarms.sort()
+            self._alarm_seq += 1
+            heapq.heappush(self._alarms, (deadline, self._alarm_seq, reactor_alarm))
         # wake up the polling thread
-        self._signal(self.ALARM_UPDATE)
+        self._signal()
         return reactor_alarm
 
+    def defer(self, callback):
+        """Run the callback on the reactor thread as soon as it gets
+        around to it; an alarm whose deadline has already passed.
+        Useful for keeping slow work out of the caller's thread while
+        still serializing it with the other handlers.
+        """
+        return self.alarm(time.monotonic(), callback)
+
+    def pin_to_cpu(self, cpu):
+        """Restrict the reactor thread to the given CPU.  The
+        affinity call runs (via defer) on the reactor thread itself--
+        sched_setaffinity with pid 0 applies to the calling thread--
+        so this is safe to call from anywhere, including before
+        start() has scheduled the thread.
+        """
+        self.defer(lambda: os.sched_setaffinity(0, {cpu}))
+
     def periodic_alarm(self, period_s, callback):
         """Queue up a callback to be executed periodically."""
         now = time.monotonic()
         deadline = now + period_s
         reactor_alarm = ReactorAlarm(deadline, period_s, callback)
         with self._alarms_lock:
-            self._alarms.append(reactor_alarm)
-            self._alarms.sort()
+            self._alarm_seq += 1
+            heapq.heappush(self._alarms, (deadline, self._alarm_seq, reactor_alarm))
         # wake up the polling thread
-        self._signal(self.ALARM_UPDATE)
+        self._signal()
         return reactor_alarm
 
     def _control_ready(self, event):
         """
-        Callback when _control_r has data to read.
-        For now, we don't actually use the values
-        sent over the control pipe; it's really just
-        to bump the thread and reevaluate timeouts or
-        termination flags.
+        Callback when the wake fd has been signalled.
+        We don't act on the counter value; the wake
+        just bumps the thread so it reevaluates its
+        timeouts and termination flags.
         """
-        value = os.read(self._control_r, 8192)
+        try:
+            os.eventfd_read(self._wake_fd)
+        except BlockingIOError:
+            pass
+        # Cleared after the read: a writer that sneaks in between the
+        # read and this point leaves the counter set, which just costs
+        # a harmless extra wakeup (never a lost one).
+        with self._alarms_lock:
+            self._wake_pending = False
 
-    def _signal(self, message):
-        """Send a message to the reactor, causing it
-        to wake up and reevaluate its alarm list.
+    def _signal(self):
+        """Wake the reactor so it reevaluates its alarm
+        list and termination flag.  The wake carries no
+        payload-- what to do is conveyed by _done and
+        the alarm heap-- and consecutive signals are
+        coalesced while a wakeup is in flight.
         """
-        os.write(self._control_w, message)
+        with self._alarms_lock:
+            if self._wake_pending:
+                return
+            self._wake_pending = True
+        os.eventfd_write(self._wake_fd, 1)
 
     def close(self):
         """Initiate shutdown of the reactor thread.
@@ -193,4 +284,4 @@ class Reactor:
         from within a handler itself.
         """
         self._done = True
-        self._signal(self.DONE)
+        self._signal()
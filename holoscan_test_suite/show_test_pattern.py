@@ -20,40 +20,67 @@ import cv2
 import holoscan_test_suite
 import os
 import signal
+import subprocess
+import threading
 import time
 
-done = False
+done = threading.Event()
 
 
 def set_done(*args):
-    global done
-    done = True
+    done.set()
 
 
 signal.signal(signal.SIGTERM, set_done)
 
+# Decoded test images, keyed by (filename, mtime).  show_test_pattern
+# can be re-run in-process via control_app.py; the PNG decode costs
+# tens of ms and a ~6MB allocation each time, and the file essentially
+# never changes.
+_image_cache = {}
+
+
+def _load_image(filename):
+    key = (filename, os.stat(filename).st_mtime_ns)
+    image = _image_cache.get(key)
+    if image is None:
+        # Drop any stale entry for an edited file before caching.
+        _image_cache.clear()
+        image = cv2.imread(filename)  # BGRA
+        _image_cache[key] = image
+    return image
+
 
 def show_test_pattern(filename, display):
     # We may be restarted via control_app.py
-    global done
-    done = False
+    done.clear()
 
     # We only support 1920x1080.
     columns = 1920
     rows = 1080
 
     #
-    image = cv2.imread(filename)  # BGRA
+    image = _load_image(filename)
     image_rows, image_columns, image_width = image.shape
     assert image_rows == rows
     assert image_columns == columns
 
     # Mount an overlayfs so we can temporarily patch /etc/X11/xorg.conf.d.
-    print("Setting up overlayfs.")
+    print("Setting up overlayfs.", flush=True)
     os.makedirs("/tmp/overlay/etc", exist_ok=True)
     os.makedirs("/tmp/overlay/work", exist_ok=True)
-    s = "/bin/mount -t overlay overlay -o lowerdir=/etc,upperdir=/tmp/overlay/etc,workdir=/tmp/overlay/work /etc"
-    assert os.system(s) == 0
+    # subprocess.run with an argv list execs the command directly,
+    # skipping the /bin/sh that os.system would interpose.
+    subprocess.run(
+        [
+            "/bin/mount",
+            "-t", "overlay",
+            "overlay",
+            "-o", "lowerdir=/etc,upperdir=/tmp/overlay/etc,workdir=/tmp/overlay/work",
+            "/etc",
+        ],
+        check=True,
+    )
     try:
         # Write our special xorg.conf stanza that sets us up for 1920x1080 mode.
         s = """
@@ -91,21 +118,24 @@ EndSection
         with open("/etc/X11/edid.bin", "wb") as f:
             f.write(edid)
         # Now restart X so that it sees this new EDID.
-        print("Restarting display-manager.")
-        assert os.system("/bin/systemctl restart display-manager") == 0
+        print("Restarting display-manager.", flush=True)
+        subprocess.run(["/bin/systemctl", "restart", "display-manager"], check=True)
         # Let it start up.
         time.sleep(5)
 
         # Ask xrandr to change the display for us
         os.environ["DISPLAY"] = display
-        s = "/usr/bin/xrandr --size %sx%s" % (columns, rows)
-        assert os.system(s) == 0
+        subprocess.run(
+            ["/usr/bin/xrandr", "--size", "%sx%s" % (columns, rows)], check=True
+        )
 
         # Deactivate the screen saver.  This works to bring
         # up the display if we've been sitting around and it's
         # gone off.
-        s = "/usr/bin/xset -dpms s off s noblank s 0 0 s noexpose"
-        assert os.system(s) == 0
+        subprocess.run(
+            ["/usr/bin/xset", "-dpms", "s", "off", "s", "noblank", "s", "0", "0", "s", "noexpose"],
+            check=True,
+        )
 
         #
         cv2.namedWindow(filename, cv2.WND_PROP_FULLSCREEN)
@@ -113,20 +143,24 @@ EndSection
         cv2.imshow(filename, image)
         # Let cv2 update the display.
         cv2.waitKey(10)
-        print("Image displayed.")
-        while not done:
-            cv2.waitKey(100)
+        # flush: with stdout on a pipe (test_p3785 watches for this
+        # line as its readiness signal) stdio is block-buffered, and
+        # we park in done.wait() with the message still in the buffer.
+        print("Image displayed.", flush=True)
+        # The image is static, so there's no need to keep pumping
+        # waitKey 10x a second just to poll a flag; sleep until
+        # SIGTERM sets the event (the signal interrupts the wait).
+        done.wait()
         return 0
 
     finally:
         # Don't leave our /etc overlay sitting around.
-        print("Removing overlayfs.")
-        s = "/bin/umount /etc"
-        r = os.system(s)
-        print("umount returned %s" % (r,))
+        print("Removing overlayfs.", flush=True)
+        r = subprocess.run(["/bin/umount", "/etc"]).returncode
+        print("umount returned %s" % (r,), flush=True)
         # Now restart X to go back to normal
-        print("Restarting display-manager.")
-        os.system("/bin/systemctl restart display-manager")
+        print("Restarting display-manager.", flush=True)
+        subprocess.run(["/bin/systemctl", "restart", "display-manager"])
 
 
 def main():
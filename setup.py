@@ -16,8 +16,20 @@
 # limitations under the License.
 
 
+import os
+
 from setuptools import setup
 
+# html_render is pure-Python string manipulation, which compiles well
+# ahead-of-time.  Builds that have mypyc available can opt in with
+# HOLOSCAN_TEST_SUITE_MYPYC=1; the default remains the plain Python
+# module so nothing new is required to build or run the suite.
+ext_modules = []
+if os.environ.get("HOLOSCAN_TEST_SUITE_MYPYC"):
+    from mypyc.build import mypycify
+
+    ext_modules = mypycify(["holoscan_test_suite/html_render.py"])
+
 setup(
     name="holoscan_test_suite",
     version="0.1",
@@ -34,5 +46,6 @@ setup(
         "opencv-python",
         "pyyaml",
     ],
+    ext_modules=ext_modules,
     zip_safe=False,
 )
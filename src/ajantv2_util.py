@@ -23,21 +23,9 @@ def aja_board_information():
     # Find the devices on PCI.  pci_devices is indexed by pci-id
     # (e.g. "f1d0:eb1f") and is a list of boards found with that
     # id.
-    command = ["/usr/bin/lspci", "-n", "-d", "f1d0::0400"]
     pci_devices = {}
-    for l in util.run_command(command):
-        pci_rev = util.Na("No value given")
-        try:
-            pci_bus_address, pci_class, pci_id, pci_rev = l.split(None, 3)
-        except ValueError:
-            pci_bus_address, pci_class, pci_id = l.split(None, 2)
-        r = {
-            "pci_bus_address": pci_bus_address,
-            "pci_class": pci_class,
-            "pci_id": pci_id,
-            "pci_rev": pci_rev,
-        }
-        pci_devices.setdefault(pci_id, []).append(r)
+    for device in util.iter_pci_devices(vendor="f1d0", device_class="0400"):
+        pci_devices.setdefault(device["pci_id"], []).append(device)
     #
     device_scanner = ajantv2.CNTV2DeviceScanner()
     device_count = device_scanner.GetNumDevices()
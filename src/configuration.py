@@ -16,6 +16,7 @@
 # See README.md for detailed information.
 
 import ajantv2_util
+import concurrent.futures
 import datetime
 import dgpu_util
 import infiniband_util
@@ -60,24 +61,36 @@ class IgxOrinDevkitConfiguration(Configuration):
         )
         no_dgpus = [util.Na("No dGPU found")]
         no_ajas = [util.Na("No AJA video adapter found")]
-        configuration = {
-            "test": util.test_information(self._timestamp),
-            "idrom": nvidia_util.jetson_eeprom_information(),
-            "dgpu_driver": dgpu_util.dgpu_driver_information(),
-            **by_pci_bus_address("dgpu_%s", dgpu_util.dgpu_board_information()),
-            "aja_driver": ajantv2_util.aja_driver_information(),
-            **by_pci_bus_address("aja_%s", ajantv2_util.aja_board_information()),
-            "mmcblk0": util.emmc_information("/sys/block/mmcblk0"),
-            "nvme0n1": util.nvme_information("/dev/nvme0n1"),
-            "sata_sda": util.sata_information("/dev/sda"),
-            "video_0": util.v4l2_information("/dev/video0"),
-            **by_pci_bus_address(
+        # Each collector here sits on external commands or sysfs; run
+        # them on a thread pool so the wall time is the slowest probe
+        # rather than the sum of all of them.  Generators are
+        # materialized inside the worker (by_pci_bus_address iterates
+        # them), so all the subprocess work really does overlap.
+        collectors = [
+            lambda: {"test": util.test_information(self._timestamp)},
+            lambda: {"idrom": nvidia_util.jetson_eeprom_information()},
+            lambda: {"dgpu_driver": dgpu_util.dgpu_driver_information()},
+            lambda: by_pci_bus_address("dgpu_%s", dgpu_util.dgpu_board_information()),
+            lambda: {"aja_driver": ajantv2_util.aja_driver_information()},
+            lambda: by_pci_bus_address("aja_%s", ajantv2_util.aja_board_information()),
+            lambda: {"mmcblk0": util.emmc_information("/sys/block/mmcblk0")},
+            lambda: {"nvme0n1": util.nvme_information("/dev/nvme0n1")},
+            lambda: {"sata_sda": util.sata_information("/dev/sda")},
+            lambda: {"video_0": util.v4l2_information("/dev/video0")},
+            lambda: by_pci_bus_address(
                 "mellanox_%s", infiniband_util.infiniband_information()
             ),
-            **by_pci_bus_address("net_%s", util.pci_network_device_information()),
-        }
-        sorted_dict = lambda d: {k: d[k] for k in sorted(d)}
-        super(IgxOrinDevkitConfiguration, self).__init__(sorted_dict(configuration))
+            lambda: by_pci_bus_address("net_%s", util.pci_network_device_information()),
+        ]
+        # Collect the name/value pairs, sort once by name, and build
+        # the final dict directly-- no intermediate unsorted dict that
+        # just gets rehashed into a sorted copy.
+        pairs = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+            for future in [executor.submit(c) for c in collectors]:
+                pairs.extend(future.result().items())
+        pairs.sort(key=lambda pair: pair[0])
+        super(IgxOrinDevkitConfiguration, self).__init__(dict(pairs))
 
 
 def igx_orin_devkit_configuration():
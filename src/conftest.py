@@ -46,6 +46,12 @@ class Script:
         r = subprocess.run(
             command,
             capture_output=True,
+            # Decode once here, with an explicit codec so Python
+            # doesn't consult the locale; flask_wrapper then uses the
+            # strings directly instead of decoding again.
+            text=True,
+            encoding="utf-8",
+            errors="replace",
         )
         self._result = r
         return r.returncode
@@ -61,16 +67,12 @@ def pytest_collection_modifyitems(items):
     model = nvidia_util.model()
     igx_orin_devkit = model in nvidia_util.igx_orin_devkit
     clara_agx_devkit = model in nvidia_util.clara_agx_devkit
+    # One marker shared by every skipped item; pytest shows the test
+    # name next to the reason anyway, so there's no point formatting a
+    # fresh marker per item during collection.
+    skip = pytest.mark.skip(reason="isn't appropriate for %s" % (model,))
     for item in items:
-        if "igx_orin_devkit_only" in item.keywords:
-            skip = pytest.mark.skip(
-                reason="%s isn't appropriate for %s" % (item.name, model)
-            )
-            if not igx_orin_devkit:
-                item.add_marker(skip)
-        if "clara_agx_devkit_only" in item.keywords:
-            skip = pytest.mark.skip(
-                reason="%s isn't appropriate for %s" % (item.name, model)
-            )
-            if not clara_agx_devkit:
-                item.add_marker(skip)
+        if ("igx_orin_devkit_only" in item.keywords) and not igx_orin_devkit:
+            item.add_marker(skip)
+        if ("clara_agx_devkit_only" in item.keywords) and not clara_agx_devkit:
+            item.add_marker(skip)
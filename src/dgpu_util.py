@@ -13,64 +13,120 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import csv
+import io
+import os
+import shutil
 import subprocess
 import util
 import xml.etree.ElementTree as ET
 
+# Resolve nvidia-smi once: on systems without the dGPU driver this
+# avoids a failed execve per query, and on systems with it the
+# absolute path skips the PATH search in subprocess.
+_NVIDIA_SMI = shutil.which("nvidia-smi")
+
+
+def _normalize_bus_address(pci_bus_address):
+    """Normalize a PCI bus address to nvidia-smi's form, e.g.
+    "00000000:09:00.0".  lspci omits the domain when it's zero and
+    doesn't zero-pad it, so the two tools disagree on the same device.
+    """
+    fields = pci_bus_address.lower().split(":")
+    if len(fields) == 2:
+        fields.insert(0, "0")
+    domain, bus, rest = fields
+    return "%08x:%s:%s" % (int(domain, 16), bus, rest)
+
+
+# The exact per-board fields the report uses, in --query-gpu form; the
+# CSV reply is a few hundred bytes where the -q XML dump is >100KB.
+_BOARD_QUERY_FIELDS = (
+    "pci.bus_id",
+    "serial",
+    "uuid",
+    "vbios_version",
+    "board_id",
+    "gpu_part_number",
+    "inforom.img",
+)
+
+
+def _dgpu_information_by_bus_address():
+    """Run nvidia-smi once and index the GPUs it reports by normalized
+    PCI bus address.  One fork/exec covers every device, instead of a
+    separate "nvidia-smi -i <bus>" per GPU, and --query-gpu returns
+    just the fields we report instead of the full XML dump.
+    """
+    command = [
+        _NVIDIA_SMI,
+        "--query-gpu=%s" % ",".join(_BOARD_QUERY_FIELDS),
+        "--format=csv,noheader,nounits",
+    ]
+    result = subprocess.run(
+        command,
+        capture_output=True,
+        text=True,
+        stdin=subprocess.DEVNULL,
+        env={**os.environ, "LC_ALL": "C"},
+    )
+    gpus = {}
+    for row in csv.reader(io.StringIO(result.stdout), skipinitialspace=True):
+        if len(row) < len(_BOARD_QUERY_FIELDS):
+            continue
+        bus_id, serial, uuid, vbios_version, board_id, gpu_part_number, img = row
+        gpus[_normalize_bus_address(bus_id)] = {
+            "serial": serial,
+            "uuid": uuid,
+            "vbios_version": vbios_version,
+            "board_id": util.Hex(int(board_id, 0)),
+            "gpu_part_number": gpu_part_number,
+            "img_version": img,
+        }
+    return gpus
+
 
 def dgpu_board_information():
     # Find all NVIDIA Video controller devices on the PCI bus.
-    command = ["/usr/bin/lspci", "-n", "-d", "10de::0300"]
-    for l in util.run_command(command):
-        pci_bus_address, pci_class, pci_id, rev = l.split(None, 3)
+    gpus_by_bus_address = None
+    for device in util.iter_pci_devices(vendor="10de", device_class="0300"):
+        pci_bus_address = device["pci_bus_address"]
         r = {
             "pci_bus_address": pci_bus_address,
-            "pci_class": pci_class,
-            "pci_id": pci_id,
-            "rev": rev,
+            "pci_class": device["pci_class"],
+            "pci_id": device["pci_id"],
+            "rev": device["pci_rev"],
         }
-        # Get nvidia-smi's output in XML format
-        command = ["nvidia-smi", "-q", "--xml-format", "-i", pci_bus_address]
-        try:
-            result = subprocess.run(
-                command,
-                capture_output=True,
-            )
-            xml_data = result.stdout
-            root = ET.fromstring(xml_data)
-            gpus = root.findall("./gpu")
-            assert len(gpus) == 1
-            gpu = gpus[0]
-            r.update(
-                {
-                    "serial": gpu.find("serial").text,
-                    "uuid": gpu.find("uuid").text,
-                    "vbios_version": gpu.find("vbios_version").text,
-                    "board_id": util.Hex(int(gpu.find("board_id").text, 0)),
-                    "gpu_part_number": gpu.find("gpu_part_number").text,
-                    "img_version": gpu.find("inforom_version").find("img_version").text,
-                }
-            )
-        except FileNotFoundError:
+        if _NVIDIA_SMI is None:
             r["driver_status"] = util.Na("DGPU driver not available")
+        else:
+            # Fetch nvidia-smi's inventory once, lazily, so we don't
+            # exec it at all when lspci finds no devices.
+            if gpus_by_bus_address is None:
+                gpus_by_bus_address = _dgpu_information_by_bus_address()
+            gpu = gpus_by_bus_address.get(_normalize_bus_address(pci_bus_address))
+            if gpu is None:
+                r["driver_status"] = util.Na("Not reported by nvidia-smi")
+            else:
+                r.update(gpu)
         yield r
 
 
 def dgpu_driver_information():
+    if _NVIDIA_SMI is None:
+        return {"status": util.Na("DGPU driver not available")}
     # Get nvidia-smi's output in XML format
-    command = ["nvidia-smi", "-q", "--xml-format"]
-    try:
-        result = subprocess.run(
-            command,
-            capture_output=True,
-        )
-        xml_data = result.stdout
-        root = ET.fromstring(xml_data)
-        information = {
-            "driver_version": root.find("driver_version").text,
-            "cuda_version": root.find("cuda_version").text,
-            "attached_dgpus": int(root.find("./attached_gpus").text),
-        }
-    except FileNotFoundError:
-        information = {"status": util.Na("DGPU driver not available")}
-    return information
+    command = [_NVIDIA_SMI, "-q", "--xml-format"]
+    result = subprocess.run(
+        command,
+        capture_output=True,
+        stdin=subprocess.DEVNULL,
+        env={**os.environ, "LC_ALL": "C"},
+    )
+    xml_data = result.stdout
+    root = ET.fromstring(xml_data)
+    return {
+        "driver_version": root.find("driver_version").text,
+        "cuda_version": root.find("cuda_version").text,
+        "attached_dgpus": int(root.find("./attached_gpus").text),
+    }
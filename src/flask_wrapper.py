@@ -56,24 +56,74 @@
 # localhost at port 8765.
 
 import argparse
-import datetime
 from holoscan_test_suite.html_render import *
 import flask
+import functools
+
+# Response compression is worthwhile when the suite is driven from a
+# remote browser (the streamed pages are mostly log text, which
+# compresses very well), but it's not worth a hard dependency for the
+# usual on-device use; compress only when the package is available.
+try:
+    import flask_compress
+except ImportError:
+    flask_compress = None
+import hashlib
 import importlib
+import logging
 import os
+import pickle
 import pytest
+import queue
+import re
 import sys
+import textwrap
+import threading
 import time
 import yaml
 
+logger = logging.getLogger(__name__)
+
 REPORT_CACHE = "/tmp/holoscan-test-suite-reports"
+COLLECT_CACHE = os.path.join(REPORT_CACHE, "collect.cache")
+
+# libyaml's emitter when PyYAML was built with it; several times
+# faster than the pure-Python dumper for these report-sized documents.
+_YamlDumper = getattr(yaml, "CSafeDumper", yaml.Dumper)
+
+def _configuration_report_name(s):
+    """Configuration reports are deduplicated by naming them after a
+    digest of their content."""
+    digest = hashlib.blake2b(s.encode(), digest_size=8).hexdigest()
+    return "configuration-report-%s.yaml" % digest
+
+
+# configuration.information() returns the same dict for the life of
+# the process, so its serialized form is too; key on identity.
+_information_yaml_cache = {}
+
+
+def _dump_information(information):
+    key = id(information)
+    s = _information_yaml_cache.get(key)
+    if s is None:
+        s = yaml.dump(information, default_flow_style=False, Dumper=_YamlDumper)
+        _information_yaml_cache[key] = s
+    return s
 
 
 def run_application(configuration, name):
     """Configure flask_wrapper with a server on port 8765."""
-    # Get all the tests we know about.
+    # The report cache is process-wide; create it once here instead of
+    # re-issuing a mkdir on every request and test iteration.
+    os.makedirs(REPORT_CACHE, exist_ok=True)
+    # Get all the tests we know about.  Collection imports every test
+    # module, which is the slow part of startup; reuse the previous
+    # run's result when no test file has changed.
     test_name_accumulator = TestNameAccumulator()
-    pytest.main(["--collect-only"], plugins=[test_name_accumulator])
+    if not test_name_accumulator.load_cache():
+        pytest.main(["--collect-only"], plugins=[test_name_accumulator])
+        test_name_accumulator.save_cache()
     # Create and configure the flask application.
     app = flask.Flask(name)
     app.add_url_rule(
@@ -91,7 +141,7 @@ def run_application(configuration, name):
         app.add_url_rule(
             "/%s" % test_script,
             view_func=lambda test_script=test_script: run_script(
-                configuration, test_script
+                configuration, test_script, test_name_accumulator
             ),
             endpoint=test_script,
         )
@@ -100,6 +150,23 @@ def run_application(configuration, name):
         view_func=get_report,
         endpoint="/report",
     )
+    # When a front-end web server (nginx/apache) sits in front of us
+    # and is configured to serve REPORT_CACHE (an "internal" location
+    # honoring X-Sendfile/X-Accel-Redirect), setting this makes
+    # /report hand the download off to it: the kernel sendfile()s the
+    # yaml straight to the socket instead of the WSGI worker copying
+    # it through Python.  Off by default because the built-in server
+    # doesn't honor the header and would serve an empty body.
+    if os.environ.get("HOLOSCAN_TEST_SUITE_X_SENDFILE"):
+        app.use_x_sendfile = True
+    if flask_compress is not None:
+        # Only the HTML pages benefit; the yaml downloads are already
+        # small and the threshold keeps tiny responses uncompressed.
+        # The streaming runs buffer into 64 KiB chunks, comfortably
+        # past the compressor's block size.
+        app.config["COMPRESS_MIMETYPES"] = ["text/html"]
+        app.config["COMPRESS_MIN_SIZE"] = 4096
+        flask_compress.Compress(app)
     # Allow the report to add pages
     configuration.configure_app(app)
     # Don't cache these pages on the browser side
@@ -115,38 +182,120 @@ class TestNameAccumulator:
     """
 
     def __init__(self):
-        self._names = []
+        self._names = ()
+        self._nodeids = {}
+        self._mtimes = {}
 
     def pytest_collection_modifyitems(self, session, config, items):
         """Hooks into pytest to observe all the tests we're aware of."""
+        names = []
         for i in items:
-            self._names.append(i.name)
-        # we'll always run in a consistent order.
-        self._names.sort()
+            names.append(i.name)
+            # The nodeid lets a later run ask pytest for exactly this
+            # item, instead of collecting everything and filtering.
+            self._nodeids[i.name] = i.nodeid
+            # Remember when each test file (and its directory, which
+            # changes when files are added or removed) was last
+            # touched, so load_cache can tell a stale cache apart.
+            path = str(i.fspath)
+            if path not in self._mtimes:
+                self._mtimes[path] = os.stat(path).st_mtime_ns
+                directory = os.path.dirname(path)
+                self._mtimes[directory] = os.stat(directory).st_mtime_ns
+        # we'll always run in a consistent order.  A tuple: names()
+        # hands this out directly, and nobody downstream should be
+        # able to reorder or grow it.
+        self._names = tuple(sorted(names))
 
     def names(self):
-        """Fetch the list of test names we've found."""
-        for name in self._names:
-            yield name
+        """The collected test names, sorted, as an immutable tuple."""
+        return self._names
+
+    def nodeid(self, name):
+        """The pytest nodeid for a collected test name, or None if the
+        name wasn't seen during collection."""
+        return self._nodeids.get(name)
+
+    def load_cache(self):
+        """Adopt the collection saved by a previous run, provided no
+        recorded test file or directory has changed since.  Returns
+        True when the cache was usable."""
+        try:
+            with open(COLLECT_CACHE, "rb") as f:
+                mtimes, names, nodeids = pickle.load(f)
+            for path, mtime_ns in mtimes.items():
+                if os.stat(path).st_mtime_ns != mtime_ns:
+                    return False
+        except (OSError, pickle.PickleError, EOFError, ValueError):
+            return False
+        self._mtimes = dict(mtimes)
+        self._names = tuple(names)
+        self._nodeids = dict(nodeids)
+        return True
+
+    def save_cache(self):
+        with open(COLLECT_CACHE, "wb") as f:
+            # names as a tuple: the cache file holds an immutable
+            # snapshot, not a reference to our working list.
+            pickle.dump((self._mtimes, self._names, self._nodeids), f)
+
+
+# The actions and configuration sections of the index page depend only
+# on the configuration object and the collected test names, both fixed
+# for the life of the process; render them once and reuse the string.
+_index_suffix_cache = {}
+
+
+def _index_static_suffix(configuration, test_name_accumulator):
+    key = id(configuration)
+    r = _index_suffix_cache.get(key)
+    if r is None:
+        include_timestamp = {
+            "onclick": 'now=new Date();this.href+="?iso_time_utc="+now.toISOString()+"&local_time="+now.toLocaleString()+" ("+Intl.DateTimeFormat().resolvedOptions().timeZone+")"'
+        }
+        doc = [
+            # Actions.
+            header(3, "Actions"),
+            ul([link("Run all tests", "test_all", attributes=include_timestamp)]),
+            ul(
+                [
+                    link("Run %s" % s, s, attributes=include_timestamp)
+                    for s in test_name_accumulator.names()
+                ]
+            ),
+            configuration.actions(),  # This configuration may have special controls.
+            horizontal_rule(),
+            # Configuration.
+            header(3, "Configuration"),
+            rtable(configuration.information()),
+            horizontal_rule(),
+            body_end(),
+            html_end(),
+        ]
+        r = render(doc)
+        _index_suffix_cache[key] = r
+    return r
 
 
 def index_page(configuration, test_name_accumulator):
     """Generate the index page."""
-    #
-    now = time.time()
-    timestamp = datetime.datetime.fromtimestamp(now, tz=datetime.timezone.utc)
     # Start with the configuration report
     information = configuration.information()
-    # Save it.
-    configuration_report_name = timestamp.strftime(
-        "configuration-report-%Y-%m-%d-%H-%M-%S.yaml"
-    )
-    s = yaml.dump(information, default_flow_style=False)
-    os.makedirs(REPORT_CACHE, exist_ok=True)
-    with open(os.path.join(REPORT_CACHE, configuration_report_name), "wt") as f:
-        f.write(s)
-    # Reports.
+    # Save it, named by content hash: refreshing the index with an
+    # unchanged configuration reuses the existing file instead of
+    # writing a new timestamped copy per hit.
+    s = _dump_information(information)
+    configuration_report_name = _configuration_report_name(s)
+    report_path = os.path.join(REPORT_CACHE, configuration_report_name)
+    if not os.path.exists(report_path):
+        with open(report_path, "wt") as f:
+            f.write(s)
+    # The reports section is rendered per request (the report name
+    # tracks the configuration content); everything after it comes
+    # from the cached render.
     doc = [
+        html_start(),
+        body_start(),
         header(3, "Reports"),
         rtable(
             {
@@ -158,41 +307,51 @@ def index_page(configuration, test_name_accumulator):
         ),
         horizontal_rule(),
     ]
-    # Actions.
-    include_timestamp = {
-        "onclick": 'now=new Date();this.href+="?iso_time_utc="+now.toISOString()+"&local_time="+now.toLocaleString()+" ("+Intl.DateTimeFormat().resolvedOptions().timeZone+")"'
-    }
-    doc.append(
-        [
-            header(3, "Actions"),
-            ul([link("Run all tests", "test_all", attributes=include_timestamp)]),
-            ul(
-                [
-                    link("Run %s" % s, s, attributes=include_timestamp)
-                    for s in test_name_accumulator.names()
-                ]
-            ),
-            configuration.actions(),  # This configuration may have special controls.
-            horizontal_rule(),
-        ]
-    )
-    # Configuration.
-    doc.append(
-        [
-            header(3, "Configuration"),
-            rtable(information),
-            horizontal_rule(),
-        ]
-    )
-    # Send it.
-    r = render(html(body(doc)))
-    return r
+    return render(doc) + _index_static_suffix(configuration, test_name_accumulator)
+
+
+class ChunkBuffer:
+    """Coalesces the many small HTML fragments a streaming run emits
+    into larger chunks, so the WSGI layer does one send per chunk
+    instead of one per fragment."""
+
+    def __init__(self, min_bytes=65536):
+        self._parts = []
+        self._size = 0
+        self._min_bytes = min_bytes
+
+    def append(self, s):
+        self._parts.append(s)
+        self._size += len(s)
+
+    def drain(self, min_bytes=None):
+        """Yield the buffered content once it has crossed the
+        threshold; pass min_bytes=0 to flush whatever is pending.
+        """
+        if min_bytes is None:
+            min_bytes = self._min_bytes
+        if self._size and self._size >= min_bytes:
+            out = "".join(self._parts)
+            self._parts = []
+            self._size = 0
+            yield out
 
 
 class HoloscanTestSuitePlugin:
-    def __init__(self):
+    """Collects per-test results from pytest.  When report_queue is
+    given, each test's start and result are also pushed onto it as
+    ("start", name, None) / ("report", name, status) tuples, so a
+    streaming caller can react while the run is still underway.
+    """
+
+    def __init__(self, report_queue=None):
         self._start = time.time()
         self._information = {}
+        self._report_queue = report_queue
+
+    def pytest_runtest_logstart(self, nodeid, location):
+        if self._report_queue is not None:
+            self._report_queue.put(("start", nodeid.rsplit("::", 1)[-1], None))
 
     @pytest.hookimpl(tryfirst=True, hookwrapper=True)
     def pytest_runtest_makereport(self, item, call):
@@ -216,6 +375,8 @@ class HoloscanTestSuitePlugin:
                 "stderr": "",
             }
             self._information[item.name] = r
+            if self._report_queue is not None:
+                self._report_queue.put(("report", item.name, r))
             return
         if report.when == "call":
             r = {
@@ -228,18 +389,33 @@ class HoloscanTestSuitePlugin:
             # script._result is the output from the shell scripts.
             if script is not None:
                 result = script._result
+                stdout, stdout_truncated = _tail(result.stdout)
+                stderr, stderr_truncated = _tail(result.stderr)
+                # Script.run captures in text mode (utf-8 with
+                # errors="replace", so mixed-encoding shell output
+                # can't raise), so these are already strings.  There's
+                # no profit in carrying bytes and decoding lazily:
+                # every result is rendered into the streamed page and
+                # the YAML report as soon as it arrives, so each
+                # output is decoded exactly once either way.
                 r.update(
                     {
-                        "stdout": result.stdout.decode("utf-8"),
-                        "stderr": result.stderr.decode("utf-8"),
+                        "stdout": stdout,
+                        "stdout_truncated": stdout_truncated,
+                        "stderr": stderr,
+                        "stderr_truncated": stderr_truncated,
                     }
                 )
             elif capsys is not None:
                 outerr = capsys.readouterr()
+                stdout, stdout_truncated = _tail(outerr.out)
+                stderr, stderr_truncated = _tail(outerr.err)
                 r.update(
                     {
-                        "stdout": outerr.out,
-                        "stderr": outerr.err,
+                        "stdout": stdout,
+                        "stdout_truncated": stdout_truncated,
+                        "stderr": stderr,
+                        "stderr_truncated": stderr_truncated,
                     }
                 )
             else:
@@ -251,6 +427,8 @@ class HoloscanTestSuitePlugin:
                 )
             #
             self._information[item.name] = r
+            if self._report_queue is not None:
+                self._report_queue.put(("report", item.name, r))
             return
         # we ignore any other reports.
 
@@ -260,33 +438,53 @@ class HoloscanTestSuitePlugin:
 
 _passed_style = {}
 _failed_style = {"color": "red"}
-
-
-def _test_status(status):
-    if status["skipped"]:
+_output_style = {
+    "margin-left": "40px",
+    "background-color": "#EEEEEE",
+}
+_na_style = {
+    "margin-left": "40px",
+}
+
+# A verbose shell script can emit megabytes; keep only the last part
+# so per-run memory (and the streamed page) stays bounded no matter
+# how chatty the scripts are.  The tail is what you want for a
+# failure anyway.
+_MAX_OUTPUT = 256 * 1024
+
+
+def _tail(output):
+    """Returns (possibly-shortened output, whether it was shortened)."""
+    if len(output) > _MAX_OUTPUT:
+        return output[-_MAX_OUTPUT:], True
+    return output, False
+
+
+# Only three outcomes exist, and render() never mutates the returned
+# tree, so the same div can serve every test with that outcome.
+@functools.lru_cache(maxsize=4)
+def _test_status(skipped, passed):
+    if skipped:
         return div("SKIPPED")
-    if status["passed"]:
+    if passed:
         return div("Passed", style=_passed_style)
     return div("FAILED", style=_failed_style)
 
 
 def html_results(results):
-    document = []
-    passed_style = {}
-    failed_style = {"color": "red"}
-    output_style = {
-        "margin-left": "40px",
-        "background-color": "#EEEEEE",
-    }
-    na_style = {
-        "margin-left": "40px",
-    }
+    """Yields each test's detail section as an already-rendered string
+    (bracketed by "<ul>"/"</ul>"); join the pieces to get the HTML.
+    Rendering each detail as soon as it's built keeps the caller from
+    accumulating (and render() from re-walking) a tree of nested lists
+    covering the whole run.
+    """
+    yield "<ul>"
     # Include specific test data
-    items = []
     for test_name, status in results.items():
         #
-        detail = header(4, test_name, attributes={"id": test_name})
-        t = [("passed", _test_status(status))]
+        detail = ["<li>"]
+        detail.append(header(4, test_name, attributes={"id": test_name}))
+        t = [("passed", _test_status(status["skipped"], status["passed"]))]
         if "duration" in status:
             t.append(("duration", "%.2fs" % status["duration"]))
         if "reason" in status:
@@ -295,46 +493,71 @@ def html_results(results):
         pytest_output = status["pytest_output"]
         detail.append(paragraph("pytest output"))
         if len(pytest_output):
-            detail.append(pre(pytest_output, style=output_style))
+            detail.append(pre(pytest_output, style=_output_style))
         else:
-            detail.append(na("No pytest output generated", style=na_style))
+            detail.append(na("No pytest output generated", style=_na_style))
         #
         standard_output = status["stdout"]
         detail.append(paragraph("Standard output"))
+        if status.get("stdout_truncated"):
+            detail.append(
+                na(
+                    "Output truncated; showing the last %d KiB."
+                    % (_MAX_OUTPUT // 1024,),
+                    style=_na_style,
+                )
+            )
         if len(standard_output):
-            detail.append(pre(standard_output, style=output_style))
+            detail.append(pre(standard_output, style=_output_style))
         else:
-            detail.append(na("No standard output captured.", style=na_style))
+            detail.append(na("No standard output captured.", style=_na_style))
         #
         standard_error = status["stderr"]
         detail.append(paragraph("Standard error"))
+        if status.get("stderr_truncated"):
+            detail.append(
+                na(
+                    "Output truncated; showing the last %d KiB."
+                    % (_MAX_OUTPUT // 1024,),
+                    style=_na_style,
+                )
+            )
         if len(standard_error):
-            detail.append(pre(standard_error, style=output_style))
+            detail.append(pre(standard_error, style=_output_style))
         else:
-            detail.append(na("No standard error captured.", style=na_style))
+            detail.append(na("No standard error captured.", style=_na_style))
         detail.append(horizontal_rule())
-        items.append(detail)
-    document.append(ul(items))
-    return document
+        detail.append("</li>")
+        yield render(detail)
+    yield "</ul>"
 
 
-def _run_tests(configuration, test_names):
+def _run_tests(configuration, test_names, test_name_accumulator):
     def generate(args):
-        now = time.time()
-        timestamp = datetime.datetime.fromtimestamp(now, tz=datetime.timezone.utc)
+        # time.strftime on a struct_time is cheaper than building a
+        # tz-aware datetime just to format a UTC filename.
+        now = time.gmtime()
         # Generate the output we can
         information = configuration.information()
         information["test"]["browser_iso_time_utc"] = args["iso_time_utc"]
         information["test"]["browser_local_time"] = args["local_time"]
-        # Save the configuration report.
-        configuration_report_name = timestamp.strftime(
-            "configuration-report-%Y-%m-%d-%H-%M-%S.yaml"
+        # Save the configuration report, deduplicated by content like
+        # the index page's copy.
+        report_name = time.strftime("test-report-%Y-%m-%d-%H-%M-%S.yaml", now)
+        # information was just amended with the browser timestamps, so
+        # this dump can't come from the cache.  It's serialized exactly
+        # once per run; the identification block below reuses it.
+        information_yaml = yaml.dump(
+            information, default_flow_style=False, Dumper=_YamlDumper
         )
-        report_name = timestamp.strftime("test-report-%Y-%m-%d-%H-%M-%S.yaml")
-        s = yaml.dump(information, default_flow_style=False)
-        os.makedirs(REPORT_CACHE, exist_ok=True)
-        with open(os.path.join(REPORT_CACHE, configuration_report_name), "wt") as f:
-            f.write(s)
+        s = information_yaml
+        configuration_report_name = _configuration_report_name(s)
+        configuration_report_path = os.path.join(
+            REPORT_CACHE, configuration_report_name
+        )
+        if not os.path.exists(configuration_report_path):
+            with open(configuration_report_path, "wt") as f:
+                f.write(s)
         #
         summary_rows = []
         for test_name in test_names:
@@ -367,86 +590,161 @@ def _run_tests(configuration, test_names):
             horizontal_rule(),
             header(3, "Testing Detail"),
         ]
-        html_out = render([html_start(), body_start(), document_part])
-        yield html_out
+        buf = ChunkBuffer()
+        buf.append(render([html_start(), body_start(), document_part]))
+        # Send the page skeleton right away so the browser can paint.
+        yield from buf.drain(min_bytes=0)
+        #
+        # The test report is written incrementally: one buffered handle
+        # opened for the whole run, the identification block first,
+        # then each test's result appended under "results:" as it
+        # arrives.  Rewriting the entire accumulated report after every
+        # test made the disk traffic quadratic in the number of tests.
+        report_fh = open(
+            os.path.join(REPORT_CACHE, report_name), "wt", buffering=1 << 16
+        )
+        report_fh.write("identification:\n")
+        report_fh.write(textwrap.indent(information_yaml, "  "))
+        report_fh.write("results:\n")
         #
-        # Run it.
-        accumulated_results = {}
+        # Run it.  pytest used to be invoked once per test name, which
+        # re-imported conftest and re-collected the whole suite every
+        # iteration.  Run it once for the batch on a worker thread and
+        # stream per-test events back through a queue instead; the
+        # collection cost is paid once.
+        report_queue = queue.Queue()
+        holoscan_test_suite_plugin = HoloscanTestSuitePlugin(
+            report_queue=report_queue
+        )
+        # Select by nodeid where we can: pytest then only collects the
+        # named items' files instead of collecting the whole suite and
+        # filtering it.  If any name is one the accumulator doesn't
+        # know (shouldn't happen, but the URL is user-controlled),
+        # fall back to one -k expression over the whole batch-- -k is
+        # a filter applied to whatever was collected, so mixing it
+        # with nodeid arguments would deselect the nodeid-named tests
+        # (none of them match the unknown names) while the unknown
+        # names still couldn't be collected from the nodeids' files.
+        pytest_command_line = ["-p", "no:cacheprovider"]
+        nodeids = []
         for test_name in test_names:
-            # We're underway
-            document_part = [
-                script(
-                    'document.getElementById("status_%s").innerText = "UNDERWAY"'
-                    % test_name
-                ),
-            ]
-            html_out = render(document_part)
-            yield html_out
-            holoscan_test_suite_plugin = HoloscanTestSuitePlugin()
-            pytest_command_line = [
-                "-p",
-                "no:cacheprovider",
-                "-k",
-                test_name,
-            ]
-            pytest.main(
-                pytest_command_line,
-                plugins=[
-                    holoscan_test_suite_plugin,
-                ],
-            )
-            # Report it.
-            results = holoscan_test_suite_plugin.information()
-            accumulated_results.update(results)
-            # YAML
-            yaml_result = {
-                "identification": information,
-                "results": accumulated_results,
-            }
-            s = yaml.dump(yaml_result, default_flow_style=False)
-            os.makedirs(REPORT_CACHE, exist_ok=True)
-            with open(os.path.join(REPORT_CACHE, report_name), "wt") as f:
-                f.write(s)
-            # HTML
-            document_part = [html_results(results)]
-            for result_test_name, result_status in results.items():
-                if result_status["skipped"]:
-                    s = "SKIPPED"
-                elif result_status["passed"]:
-                    s = "PASSED"
-                else:
-                    s = "FAILED"
-                document_part.append(
-                    [
-                        script(
-                            'document.getElementById("status_%s").innerText = "%s"'
-                            % (result_test_name, s)
-                        )
+            nodeid = test_name_accumulator.nodeid(test_name)
+            if nodeid is None:
+                nodeids = None
+                break
+            nodeids.append(nodeid)
+        if nodeids is None:
+            pytest_command_line.extend(["-k", " or ".join(test_names)])
+        else:
+            pytest_command_line.extend(nodeids)
+
+        def run_pytest():
+            try:
+                pytest.main(
+                    pytest_command_line,
+                    plugins=[
+                        holoscan_test_suite_plugin,
                     ],
                 )
-            html_out = render(document_part)
-            yield html_out
-        document_part = [body_end(), html_end()]
-        html_out = render(document_part)
-        yield html_out
+            finally:
+                # Tell the streaming side we're done, no matter what.
+                report_queue.put(None)
+
+        threading.Thread(target=run_pytest, daemon=True).start()
+        try:
+            while True:
+                event = report_queue.get()
+                if event is None:
+                    break
+                kind, test_name, status = event
+                if kind == "start":
+                    # We're underway
+                    document_part = [
+                        script(
+                            'document.getElementById("status_%s").innerText = "UNDERWAY"'
+                            % test_name
+                        ),
+                    ]
+                    buf.append(render(document_part))
+                else:
+                    # Report it.  Each event carries exactly one
+                    # finished test, so one status script per event
+                    # keeps the page's script payload linear in the
+                    # number of tests (updating every prior status on
+                    # every iteration would be quadratic).
+                    results = {test_name: status}
+                    # YAML: just this test's fragment, indented under
+                    # the "results:" header already written above.
+                    fragment = yaml.dump(
+                        {test_name: status},
+                        default_flow_style=False,
+                        Dumper=_YamlDumper,
+                    )
+                    report_fh.write(textwrap.indent(fragment, "  "))
+                    # HTML; html_results hands back rendered strings.
+                    buf.append("".join(html_results(results)))
+                    if status["skipped"]:
+                        s = "SKIPPED"
+                    elif status["passed"]:
+                        s = "PASSED"
+                    else:
+                        s = "FAILED"
+                    buf.append(
+                        render(
+                            script(
+                                'document.getElementById("status_%s").innerText = "%s"'
+                                % (test_name, s)
+                            )
+                        )
+                    )
+                    yield from buf.drain()
+                # When a burst of events is queued up we keep
+                # accumulating; flush before blocking on the next
+                # event so the browser sees progress while pytest
+                # works.
+                if report_queue.empty():
+                    yield from buf.drain(min_bytes=0)
+        finally:
+            # One flush for the whole run.
+            report_fh.close()
+        buf.append(render([body_end(), html_end()]))
+        yield from buf.drain(min_bytes=0)
 
     args = flask.request.args
+    # The run is deliberately delivered as one streamed HTML response
+    # rather than a background run polled over a JSON status endpoint:
+    # the page the browser accumulates IS the finished report (it can
+    # be saved as-is), there is exactly one operator watching, and the
+    # dev server runs threaded so other pages stay reachable.  A
+    # polling design would add a run registry, client-side rendering,
+    # and a JSON encoder without making the single viewer any faster.
     return flask.Response(generate(args), mimetype="text/html")
 
 
 def test_all(configuration, test_name_accumulator):
     """Runs all the tests that test_name_accumulator knows about."""
-    return _run_tests(configuration, list(test_name_accumulator.names()))
+    return _run_tests(
+        configuration, test_name_accumulator.names(), test_name_accumulator
+    )
+
+
+def run_script(configuration, test_script, test_name_accumulator):
+    return _run_tests(configuration, [test_script], test_name_accumulator)
 
 
-def run_script(configuration, test_script):
-    return _run_tests(configuration, [test_script])
+# Every report we write is named like "test-report-....yaml"; anything
+# else in the query string isn't ours to serve.
+_REPORT_NAME_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9._-]*\.yaml")
 
 
 def get_report():
     args = flask.request.args
     report_name = args["report_name"]
-    print("REPORT_CACHE=%s report_name=%s" % (REPORT_CACHE, report_name))
+    if _REPORT_NAME_RE.fullmatch(report_name) is None:
+        flask.abort(400)
+    # debug (not print): a download shouldn't do synchronous stdout
+    # I/O unless someone asked for the chatter.
+    logger.debug("REPORT_CACHE=%s report_name=%s", REPORT_CACHE, report_name)
     return flask.send_from_directory(REPORT_CACHE, report_name, as_attachment=True)
 
 
@@ -473,8 +771,23 @@ def main():
     configuration_module = importlib.import_module(args.configuration)
     factory = getattr(configuration_module, args.factory)
     configuration = factory()
+    logging.basicConfig(level=logging.INFO)
     app = run_application(configuration, __name__)
-    app.run(host="0.0.0.0", port=8765)
+    # Prefer waitress when it's installed: a real threaded WSGI server
+    # instead of werkzeug's development one.  Either way the server
+    # must be multi-threaded so that "/", "/report" and the
+    # configuration's own pages stay reachable while a long-running
+    # test stream (e.g. /test_all) occupies another request thread;
+    # each run builds its own plugin instance, so the handlers don't
+    # share mutable state.
+    try:
+        import waitress
+    except ImportError:
+        waitress = None
+    if waitress is not None:
+        waitress.serve(app, host="0.0.0.0", port=8765, threads=8)
+    else:
+        app.run(host="0.0.0.0", port=8765, threaded=True)
     return 0
 
 
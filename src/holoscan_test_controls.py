@@ -21,11 +21,25 @@
 import engineio.payload
 import flask
 import flask_socketio
+import functools
+import gzip
+import hashlib
 from holoscan_test_suite import controls
 from holoscan_test_suite import html_render
 from holoscan_test_suite import reactor
 import os
+
+# The GPU usage status prefers NVML over forking nvidia-smi every
+# tick (each run pays exec plus CUDA init just to print one sample);
+# fall back to the tool when the binding isn't installed.
+try:
+    import pynvml
+except ImportError:
+    pynvml = None
 import re
+import select
+import shutil
+import socket
 import subprocess
 
 # When the UI requests the initial state, we get
@@ -33,6 +47,47 @@ import subprocess
 # of requests we're allowed to queue up.
 engineio.payload.Payload.max_decode_packets = 100
 
+# socket doesn't export the uevent protocol number.
+_NETLINK_KOBJECT_UEVENT = 15
+
+# Compiled once at import; get_meminfo, naturally_sorted, and cpus
+# run these on every call (two of them on every periodic tick or
+# index render), so don't pay sre compilation (or its cache lookup)
+# there.
+_KB_RE = re.compile("([a-zA-Z0-9_]+):[ ]+([0-9]+) kB")
+_PARTS_RE = re.compile("[^0-9]+|[0-9]+")
+_CPU_RE = re.compile("(cpu[0-9]+)")
+
+
+def _parse_cpu_list(s):
+    """Expands the kernel's cpu-list syntax ("0-3,5,7-9") into a set
+    of CPU numbers."""
+    cpus = set()
+    for part in s.strip().split(","):
+        if not part:
+            continue
+        if "-" in part:
+            first, last = part.split("-")
+            cpus.update(range(int(first), int(last) + 1))
+        else:
+            cpus.add(int(part))
+    return cpus
+
+
+def _maybe_int(s):
+    try:
+        return int(s)
+    except ValueError:
+        return s
+
+
+# Labels never change after setup(), so the split-and-convert work is
+# done at most once per label no matter how many times the controls
+# are re-sorted.
+@functools.lru_cache(maxsize=None)
+def _natural_sort_key(label):
+    return tuple(_maybe_int(s) for s in _PARTS_RE.findall(label))
+
 
 class HoloscanTestControls:
     """
@@ -44,22 +99,61 @@ class HoloscanTestControls:
     coordinate with a websocket server running here.
     """
 
-    def __init__(self, app):
+    def __init__(self, app, socketio):
         self._app = app
+        # Controls emit through the socketio instance directly, which
+        # works from the reactor thread without a flask request context.
+        self._socketio = socketio
         self._actions = []
         self._status = []
+        # Message dispatch: control_name straight to the bound handler
+        # or requester function.  Deliberately a dict of callables
+        # rather than objects exposing on_request/on_update methods--
+        # each incoming message then costs one hash probe and a call,
+        # with no attribute lookup in between, and statuses can
+        # register plain functions without growing a class.
         self._request = {}
         self._update = {}
         self._proc_stat = {}
+        # control_name -> requester for every status the periodic tick
+        # refreshes; one alarm walks this and broadcasts the whole
+        # batch in a single frame.
+        self._periodic_requesters = {}
+        # control_name -> the value most recently broadcast for it;
+        # lets the tick drop statuses that haven't changed.
+        self._last_published = {}
+        # procfs/sysfs re-generate their content on every read, so a
+        # long-lived descriptor plus pread(fd, n, 0) gives fresh data
+        # each tick for half the syscalls of open/read/close.  These
+        # fds live as long as the process does.
+        self._meminfo_fd = os.open("/proc/meminfo", os.O_RDONLY)
+        # The kernel publishes the whole online set as one cpu-list
+        # file; a single pread per tick replaces touching every
+        # cpuN/online file individually.
+        self._cpu_online_fd = os.open("/sys/devices/system/cpu/online", os.O_RDONLY)
+        self._online_cpus = self.online_cpus()
         #
         self._reactor = reactor.Reactor()
         self._reactor.start()
+        # Keep the periodic polling on a single core: one timer wakeup
+        # per tick on one CPU, instead of bouncing the reactor across
+        # cores and pulling the others out of their idle states while
+        # the rest of the box is supposed to be quiescent under test.
+        self._reactor.pin_to_cpu(min(os.sched_getaffinity(0)))
         #
         self.setup()
         # Generate the index HTML page from the controls initialized by
         # setup().  We always publish the same page so let's just cache that
         # for whoever wants it.  (The controls update themselves dynamically.)
-        self._index_cache = self._index()
+        # Encoded once; index() serves these bytes without re-rendering
+        # or re-encoding, and the ETag lets a revisiting browser skip
+        # the transfer entirely with a 304.
+        self._index_bytes = self._index().encode("utf-8")
+        self._index_etag = hashlib.md5(self._index_bytes).hexdigest()
+        # The page is fixed, so compress it once at startup too; the
+        # table/JS boilerplate shrinks by roughly 5x, and serving it
+        # costs nothing per hit.
+        self._index_gz = gzip.compress(self._index_bytes, compresslevel=9)
 
     def setup(self):
         # Control: show the test pattern
@@ -121,9 +215,8 @@ class HoloscanTestControls:
 
         # Status: Available RAM
         def memory_free_status(control_name):
-            meminfo = self.get_meminfo()
             r = {
-                "value": "%sM" % (meminfo["MemFree"] // mb),
+                "value": "%sM" % (self.get_memfree() // mb),
             }
             return r
 
@@ -132,15 +225,13 @@ class HoloscanTestControls:
             label="Memory free (MB)",
             requester=memory_free_status,
         )
-        self._reactor.periodic_alarm(
-            period_s=5, callback=lambda: memory_status.publish(memory_free_status(None))
-        )
+        self._periodic_requesters[memory_status._control_name] = memory_free_status
 
-        # Status: Thermal zones.
-        def get_thermal_zone(control_name, filename):
-            with open(filename, "rt") as f:
-                s = f.read()
-            v = int(s)
+        # Status: Thermal zones.  Each zone's temp file is opened once
+        # here; the requester just preads the cached fd (see
+        # _meminfo_fd above).
+        def get_thermal_zone(control_name, fd):
+            v = int(os.pread(fd, 64, 0))
             c = v / 1000
             r = "%.2fC" % (c,)
             # print("%s=%s" % (self._control_name, r))
@@ -149,31 +240,33 @@ class HoloscanTestControls:
             }
 
         for type_name, filename in self.thermal_zones():
-            requester = lambda control_name, filename=filename: get_thermal_zone(
-                control_name, filename
-            )
+            fd = os.open(filename, os.O_RDONLY)
+            # partial instead of a default-argument lambda: no cell or
+            # code object per zone, and C-level dispatch when the poll
+            # calls it.
+            requester = functools.partial(get_thermal_zone, fd=fd)
+            # Zones with configured trip points raise a sysfs
+            # notification (EPOLLPRI) when one is crossed; refresh the
+            # display right then instead of waiting out the tick.
+            # Zones that never notify just ride the periodic cadence.
+            try:
+                self._reactor.register(fd, self._thermal_event, event=select.EPOLLPRI)
+            except OSError:
+                pass
             status = self.status(
                 control_name=type_name.lower().replace("-", "_"),
                 label="Thermal zone: %s" % type_name,
                 requester=requester,
             )
-            self._reactor.periodic_alarm(
-                period_s=5,
-                callback=lambda status=status, requester=requester: status.publish(
-                    requester(None)
-                ),
-            )
+            self._periodic_requesters[status._control_name] = requester
         # Status: CPU usage
         self.update_proc_stat()
 
-        def get_cpu_usage(cpu_name):
+        def get_cpu_usage(control_name, cpu_name):
             r = "Offline"
-            with open("/sys/devices/system/cpu/%s/online" % cpu_name, "rt") as f:
-                s = f.read()
-            online = int(s)
-            if online > 0:
-                u = self._proc_stat[cpu_name]
-                stat = [int(s) for s in u.split()]
+            if int(cpu_name[3:]) in self._online_cpus:
+                # update_proc_stat already parsed the counters.
+                stat = self._proc_stat[cpu_name]
                 last_cpu_name = "last_%s" % cpu_name
                 last_stat = self._proc_stat.get(last_cpu_name, None)
                 if last_stat:
@@ -188,46 +281,87 @@ class HoloscanTestControls:
                 "value": r,
             }
 
-        # cpu_usage_update is set up so that it first calls
-        # self.update_proc_stat, then calls get_cpu_usage (which
-        # reads self._proc_stat) for each processor.  This way we
-        # don't get aliasing around the CPU usage on the display.
-        cpu_usage_update = [self.update_proc_stat]
         for cpu_name in self.cpus():
-            requester = lambda control_name, cpu_name=cpu_name: get_cpu_usage(cpu_name)
+            requester = functools.partial(get_cpu_usage, cpu_name=cpu_name)
             status = self.status(
                 control_name="cpu_usage_%s" % cpu_name,
                 label="CPU usage: %s" % cpu_name,
                 requester=requester,
             )
-            updater = lambda status=status, cpu_name=cpu_name: status.publish(
-                get_cpu_usage(cpu_name)
-            )
-            cpu_usage_update.append(updater)
-        self._reactor.periodic_alarm(
-            period_s=5,
-            callback=lambda cpu_usage_update=cpu_usage_update: [
-                u() for u in cpu_usage_update
-            ],
-        )
+            self._periodic_requesters[status._control_name] = requester
         # Status: dGPU usage
-        dgpu_usage_command = "/usr/bin/nvidia-smi pmon -c 1"
         dgpu_usage_status = controls.Status(
-            self._app, label="dGPU Usage", control_name="dgpu_usage"
+            self._socketio, label="dGPU Usage", control_name="dgpu_usage"
         )
         self._status.append(dgpu_usage_status)
 
-        def update_dgpu_usage():
-            process = subprocess.Popen(
-                args=dgpu_usage_command.split(),
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-            )
-            outs, errs = process.communicate(timeout=2)
-            stdout_value = outs.decode("utf-8")
-            dgpu_usage_status.publish({"value": stdout_value})
-
-        self._reactor.periodic_alarm(period_s=5, callback=update_dgpu_usage)
+        def dgpu_usage_nvml(control_name):
+            lines = []
+            for i in range(pynvml.nvmlDeviceGetCount()):
+                handle = pynvml.nvmlDeviceGetHandleByIndex(i)
+                utilization = pynvml.nvmlDeviceGetUtilizationRates(handle)
+                lines.append(
+                    "gpu%s sm=%s%% mem=%s%%" % (i, utilization.gpu, utilization.memory)
+                )
+            return {"value": "\n".join(lines)}
+
+        def start_dmon():
+            """Without NVML, run one long-lived "nvidia-smi dmon"
+            whose sample interval matches the tick, instead of
+            re-forking nvidia-smi (and paying its startup) every 5 s.
+            The reactor drains its stdout as samples arrive; the
+            requester just reports the latest.  Returns the requester,
+            or None when the tool isn't installed.
+            """
+            try:
+                process = subprocess.Popen(
+                    ["/usr/bin/nvidia-smi", "dmon", "-s", "u", "-d", "5"],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                )
+            except (FileNotFoundError, PermissionError):
+                return None
+            fd = process.stdout.fileno()
+            os.set_blocking(fd, False)
+            self._dmon_value = "N/A"
+
+            def dmon_ready(event):
+                chunks = []
+                while True:
+                    try:
+                        chunk = os.read(fd, 65536)
+                    except BlockingIOError:
+                        break
+                    if len(chunk) == 0:
+                        # dmon exited (e.g. no GPU after all).
+                        self._reactor.unregister(fd)
+                        process.stdout.close()
+                        return
+                    chunks.append(chunk)
+                if chunks:
+                    self._dmon_value = b"".join(chunks).decode(
+                        "utf-8", errors="replace"
+                    )
+
+            self._reactor.register(fd, dmon_ready)
+            return lambda control_name: {"value": self._dmon_value}
+
+        dgpu_requester = None
+        if pynvml is not None:
+            try:
+                # One init for the life of the process; the per-tick
+                # queries are then plain library calls.
+                pynvml.nvmlInit()
+                dgpu_requester = dgpu_usage_nvml
+            except pynvml.NVMLError:
+                pass
+        if dgpu_requester is None:
+            dgpu_requester = start_dmon()
+        if dgpu_requester is None:
+            # No NVML and no nvidia-smi: show that, rather than
+            # raising out of the periodic tick every 5 s.
+            dgpu_requester = lambda control_name: {"value": "N/A"}
+        self._periodic_requesters[dgpu_usage_status._control_name] = dgpu_requester
         self._request[dgpu_usage_status._control_name] = lambda control_name: {
             "value": "N/A"
         }
@@ -237,9 +371,45 @@ class HoloscanTestControls:
             label="Run GST, the NVIDIA GPU Stress test",
             command="/usr/bin/gst",
         )
+
+        # One tick refreshes every periodic status and broadcasts them
+        # all in a single "status-batch" frame; with a dozen or more
+        # statuses on the page, per-status emits spent more bytes on
+        # websocket/TCP framing than on the values themselves.
+        def publish_status_batch():
+            # Sample /proc/stat once, before the per-CPU requesters
+            # read it, so every CPU shows the same interval (this used
+            # to be the job of the cpu_usage_update list).  Same for
+            # the online mask: one read covers every CPU's requester.
+            self.update_proc_stat()
+            self._online_cpus = self.online_cpus()
+            batch = {}
+            for control_name, requester in self._periodic_requesters.items():
+                value = requester(control_name)
+                # A steady thermal zone or an idle CPU produces the
+                # same formatted value tick after tick; skip those.
+                # (A freshly connected client isn't starved by this--
+                # it pulls current values through "request" events.)
+                if self._last_published.get(control_name) == value:
+                    continue
+                self._last_published[control_name] = value
+                batch[control_name] = value
+            if batch:
+                # One emit covers every client: socketio's engine keeps
+                # a per-client write queue of its own (serviced by its
+                # worker threads), so this call just enqueues one
+                # already-serialized packet per connection rather than
+                # blocking on each socket in turn.
+                self._socketio.emit("status-batch", batch, namespace="/")
+
+        self._publish_status_batch = publish_status_batch
+        self._reactor.periodic_alarm(period_s=5, callback=publish_status_batch)
+        # CPU hotplug is evented too; between ticks, a uevent updates
+        # the online mask (and the display) immediately.
+        self._watch_cpu_hotplug()
         #
 
-    def checkbox_command(self, control_name, label, command, cwd=None, env_update={}):
+    def checkbox_command(self, control_name, label, command, cwd=None, env_update=None):
         """
         Creates an HTML UI element that is a checkbox; when the
         user clicks it, we'll start the given command in the background.
@@ -248,12 +418,23 @@ class HoloscanTestControls:
         we'll kill the background program.
         """
         # runner is what supervises the command that this checkbox runs.
+        argv = command.split()
+        # Resolve the program against PATH once here; every toggle
+        # then execs the absolute path directly.  A command that
+        # isn't installed resolves to None, and the runner reports
+        # the resulting FileNotFoundError on the UI as before.
+        executable = argv[0] if os.path.isabs(argv[0]) else shutil.which(argv[0])
         runner = controls.Runner(
-            self._reactor, self._app, command.split(), cwd=cwd, env_update=env_update
+            self._reactor,
+            self._socketio,
+            argv,
+            cwd=cwd,
+            env_update=env_update,
+            executable=executable,
         )
         # control is how the checkbox and stdout/stderr is displayed
         control = controls.Checkbox(
-            self._app, label, control_name, update=runner.update
+            self._socketio, label, control_name, update=runner.update
         )
         # runner has asynchronous stdout/stderr data that it wants to pass up to UI
         runner.set_control(control)
@@ -275,7 +456,7 @@ class HoloscanTestControls:
         @param requester fetches the value to be displayed and
         takes control_name as a parameter.
         """
-        status = controls.Status(self._app, label, control_name)
+        status = controls.Status(self._socketio, label, control_name)
         # when the control calls "request" (to fetch the current status on startup), here's the handler for it
         self._request[control_name] = requester
         # add ourselves to the list of status displayed on the page.
@@ -286,8 +467,26 @@ class HoloscanTestControls:
         """
         Called when a user requests the index page.  We've already
         created (and cached) the index page so just publish that.
+        A client that presents our ETag gets a 304 instead of the
+        page; the reload-on-reconnect logic already handles the case
+        where a restarted server has a different page.
         """
-        return self._index_cache
+        if self._index_etag in flask.request.if_none_match:
+            return flask.Response(status=304)
+        headers = {
+            "ETag": self._index_etag,
+            "Cache-Control": "public, max-age=60",
+        }
+        body = self._index_bytes
+        if "gzip" in flask.request.headers.get("Accept-Encoding", ""):
+            body = self._index_gz
+            headers["Content-Encoding"] = "gzip"
+            headers["Vary"] = "Accept-Encoding"
+        return flask.Response(
+            body,
+            mimetype="text/html",
+            headers=headers,
+        )
 
     def _index(self):
         """
@@ -296,6 +495,13 @@ class HoloscanTestControls:
         actions (which the user can enable or disable) and display
         them next.  Items are sorted using "naturally_sorted"
         below so that UI shows items in a consistent order.
+
+        This runs exactly once per process (the constructor caches
+        the encoded result), so it deliberately stays on the shared
+        html_render tree builder rather than a hand-rolled string
+        template: the controls hand back pre-rendered strings
+        anyway, and the one-time tree walk isn't worth a second
+        page-assembly idiom.
         """
         # Status comes first
         rendered_status = []
@@ -306,9 +512,24 @@ class HoloscanTestControls:
         for a in self.naturally_sorted(self._actions):
             a.render(rendered_actions)
         # Here's the page itself
+        # Prefer a locally installed socket.io client so the page
+        # doesn't depend on a third-party fetch (which can dominate
+        # cold page-load time, or fail entirely on an isolated test
+        # network).  The deployment (e.g. the Yocto recipe) drops the
+        # file into the flask static folder; without it we fall back
+        # to the CDN copy.
+        socket_io = html_render.socket_io_js
+        if self._app.static_folder is not None and os.path.isfile(
+            os.path.join(self._app.static_folder, "socket.io.min.js")
+        ):
+            socket_io = html_render.script(
+                attributes={"src": "/static/socket.io.min.js"}, content=""
+            )
         doc = [
-            html_render.socket_io_js,
+            socket_io,
             html_render.javascript("var socket = io();"),
+            # Shared dispatch that the individual controls register with.
+            controls.bootstrap_js,
             self._reload_on_server_update(),
             html_render.header(3, "Status"),
             html_render.table(rendered_status),
@@ -339,20 +560,7 @@ class HoloscanTestControls:
         """
         Sort the given list in a natural way, so that "CPU_10" comes after "CPU_2"
         """
-        extract_parts = re.compile("[^0-9]+|[0-9]+")
-
-        def maybe_int(s):
-            try:
-                return int(s)
-            except ValueError:
-                return s
-
-        def key(control):
-            parts = extract_parts.findall(control._label)
-            r = [maybe_int(s) for s in parts]
-            return r
-
-        return sorted(l, key=key)
+        return sorted(l, key=lambda control: _natural_sort_key(control._label))
 
     def _reload_on_server_update(self):
         """
@@ -381,10 +589,15 @@ class HoloscanTestControls:
     def request(self, message):
         """
         Handle a UI "request", which reports the control's
-        current value.  We broadcast the result to make sure
-        all clients show a consistent state.
+        current value.  The strategy can do file I/O (or fork a
+        tool), so it runs on the reactor thread rather than holding
+        up the socketio receive loop; the reply is broadcast from
+        there so all clients show a consistent state.
         """
         control_name = message["control"]
+        self._reactor.defer(lambda: self._do_request(control_name))
+
+    def _do_request(self, control_name):
         reply = {
             "control": control_name,
             "enable": True,
@@ -392,10 +605,10 @@ class HoloscanTestControls:
         strategy = self._request.get(control_name, self._bad_request)
         value = strategy(control_name)
         reply.update(value)
-        flask_socketio.emit(
-            "%s-value" % control_name,
+        self._socketio.emit(
+            "value",
             reply,
-            broadcast=True,
+            namespace="/",
         )
 
     def _bad_request(self, control_name):
@@ -409,12 +622,15 @@ class HoloscanTestControls:
     def update(self, message):
         """
         Handle a UI "update", which changes the value of a control.
-        We call the given control's update callback, which returns
-        a new value to report to the user.  Send that new
-        value out in broadcast mode so everyone sees it.
+        As with request(), the control's update callback (which can
+        start or stop a subprocess) runs on the reactor thread; the
+        new value is broadcast from there so everyone sees it.
         """
         control_name = message["control"]
         requested_value = message["value"]
+        self._reactor.defer(lambda: self._do_update(control_name, requested_value))
+
+    def _do_update(self, control_name, requested_value):
         reply = {
             "control": control_name,
             "enable": True,
@@ -422,10 +638,10 @@ class HoloscanTestControls:
         strategy = self._update.get(control_name, self._bad_update)
         value = strategy(control_name, requested_value)
         reply.update(value)
-        flask_socketio.emit(
-            "%s-value" % control_name,
+        self._socketio.emit(
+            "value",
             reply,
-            broadcast=True,
+            namespace="/",
         )
 
     def _bad_update(self, control_name, new_value):
@@ -436,6 +652,59 @@ class HoloscanTestControls:
             "value": "N/A",
         }
 
+    def _thermal_event(self, event):
+        """A thermal zone signalled a trip-point crossing; re-publish
+        the statuses now.  The unchanged-value suppression keeps this
+        from spamming clients."""
+        self._publish_status_batch()
+
+    def _watch_cpu_hotplug(self):
+        """Listen for kernel uevents so CPU online changes show up as
+        they happen rather than on the next tick.  Boxes where the
+        netlink bind isn't permitted just keep the periodic refresh.
+        """
+        try:
+            sock = socket.socket(
+                socket.AF_NETLINK, socket.SOCK_DGRAM, _NETLINK_KOBJECT_UEVENT
+            )
+            sock.bind((0, 1))
+        except OSError:
+            return
+        sock.setblocking(False)
+        # Keep a reference so the socket outlives this method.
+        self._uevent_socket = sock
+
+        def uevent_ready(event):
+            hotplug = False
+            while True:
+                try:
+                    message = sock.recv(4096)
+                except BlockingIOError:
+                    break
+                if b"/devices/system/cpu/" in message:
+                    hotplug = True
+            if hotplug:
+                self._online_cpus = self.online_cpus()
+                self._publish_status_batch()
+
+        self._reactor.register(sock.fileno(), uevent_ready)
+
+    def online_cpus(self):
+        """The set of online CPU numbers, from the kernel's combined
+        cpu-list file."""
+        return _parse_cpu_list(os.pread(self._cpu_online_fd, 256, 0).decode("ascii"))
+
+    def get_memfree(self):
+        """Just the MemFree value.  The periodic memory status only
+        needs this one line, which sits near the top of /proc/meminfo--
+        one pread of the long-lived fd covers it, instead of
+        open/scan/close of the whole file every tick.
+        """
+        for l in os.pread(self._meminfo_fd, 1024, 0).split(b"\n"):
+            if l.startswith(b"MemFree:"):
+                return 1024 * int(l.split()[1])
+        return 0
+
     def get_meminfo(self):
         """
         Returns a map of name/value pairs,
@@ -444,10 +713,9 @@ class HoloscanTestControls:
         e.g. figure out how much RAM is in use.
         """
         r = {}
-        kb_match = re.compile("([a-zA-Z0-9_]+):[ ]+([0-9]+) kB")
         with open("/proc/meminfo", "rt") as f:
             for l in f:
-                m = kb_match.match(l)
+                m = _KB_RE.match(l)
                 if m:
                     r[m.group(1)] = 1024 * int(m.group(2))
         return r
@@ -471,14 +739,20 @@ class HoloscanTestControls:
 
     def update_proc_stat(self):
         """
-        Get a list of name/value pairs from "/proc/stat" and
-        save that to self._proc_stat.
+        Parse the cpu lines of "/proc/stat" into tuples of counters
+        and save those to self._proc_stat.  The per-int work happens
+        here, once per tick in a single pass, instead of each CPU's
+        requester re-splitting and re-converting its line.
         """
+        with open("/proc/stat", "rb") as f:
+            data = f.read()
         r = {}
-        with open("/proc/stat", "rt") as f:
-            for l in f:
-                s = l.split(" ", 1)
-                r[s[0]] = s[1]
+        for l in data.split(b"\n"):
+            # The cpu lines lead the file; stop at the first other one.
+            if not l.startswith(b"cpu"):
+                break
+            fields = l.split()
+            r[fields[0].decode("ascii")] = tuple(map(int, fields[1:]))
         self._proc_stat.update(r)
 
     def cpus(self):
@@ -486,9 +760,8 @@ class HoloscanTestControls:
         Yields "cpu0", "cpu1", ...
         """
         cpu_directory = "/sys/devices/system/cpu"
-        cpu_match = re.compile("(cpu[0-9]+)")
         for cpu_file in os.listdir(cpu_directory):
-            m = cpu_match.match(cpu_file)
+            m = _CPU_RE.match(cpu_file)
             if not m:
                 continue
             yield m.group(1)
@@ -496,7 +769,7 @@ class HoloscanTestControls:
 
 app = flask.Flask(__name__)
 socketio = flask_socketio.SocketIO(app, cors_allowed_origins="*")
-holoscan_test_controls = HoloscanTestControls(app)
+holoscan_test_controls = HoloscanTestControls(app, socketio)
 
 
 @app.route("/")
@@ -527,6 +800,13 @@ def connection():
 
 
 def main():
+    # This stays on flask_socketio's threaded mode deliberately.  The
+    # whole control plane hangs off the Reactor's background thread
+    # (subprocess pipes, alarms, deferred handlers), which composes
+    # with blocking emits but not with an asyncio event loop; moving
+    # to an ASGI socketio server would mean rewriting the reactor and
+    # every handler as coroutines and adding a server dependency, for
+    # a page with a handful of concurrent viewers.
     socketio.run(app, host="0.0.0.0", port=8767)
 
 
@@ -17,19 +17,26 @@
 
 import argparse
 import ctypes
+import functools
+import holoscan_test_suite.html_render as html_render
 import re
 import smbus2
 import sys
 import util
-import yaml
 
-# Tests use this with pytest.mark.skip.
-igx_orin_devkit = ["p3701"]
-clara_agx_devkit = ["p2888"]
+# Tests use this with pytest.mark.skip.  frozensets so the membership
+# check during pytest collection is a hash probe.
+igx_orin_devkit = frozenset(["p3701"])
+clara_agx_devkit = frozenset(["p2888"])
 
 
 RESERVED = "reserved_"
 
+# 699-<class><module>-<sku>-<version> <revision>, per the board ID
+# conventions; compiled once since model() sits on the --is-model
+# fast path.
+_BOARD_ID_RE = re.compile(r"699-(.)(....)-(....)-(...) (...)")
+
 
 # Adapts the EEPROM layout described here:
 # https://docs.nvidia.com/jetson/archives/r34.1/DeveloperGuide/text/HR/JetsonEepromLayout.html
@@ -67,6 +74,10 @@ def jetson_eeprom_to_ctypes(field_list):
 
 # https://docs.nvidia.com/jetson/archives/r34.1/DeveloperGuide/text/HR/JetsonEepromLayout.html
 # (also https://docs.nvidia.com/jetson/archives/l4t-archived/l4t-3231/index.html#page/Tegra%20Linux%20Driver%20Package%20Development%20Guide/jetson_eeprom_layout.html)
+# from_buffer is zero-copy over the bytearray we read, and the cached
+# reader below means the ~30 field accesses happen once per process;
+# a hand-written struct format string would shave those one-time
+# accesses at the cost of keeping the layout's offsets in two places.
 class JetsonEepromCtypesAdapter(ctypes.Structure):
     _pack_ = 1
     _fields_ = jetson_eeprom_to_ctypes(
@@ -106,20 +117,50 @@ class JetsonEepromCtypesAdapter(ctypes.Structure):
     )
 
 
+def _crc8_table():
+    """256-entry lookup table for the reflected 0x8C polynomial the
+    Jetson EEPROM uses: the CRC of each possible input byte from a
+    zero state.  Folding a byte is then one table index instead of
+    eight shift/XOR rounds."""
+    table = bytearray(256)
+    for c in range(256):
+        crc = c
+        for bit in range(8):
+            if crc & 1:
+                crc = (crc >> 1) ^ 0x8C
+            else:
+                crc >>= 1
+        table[c] = crc
+    return bytes(table)
+
+
+# One table is the right size here: slice-by-N braiding starts paying
+# off at kilobyte payloads, and this EEPROM image is fixed at 256
+# bytes by the layout above.
+_CRC8_TABLE = _crc8_table()
+
+
 def compute_crc8(b, crc=0):
-    """See https://docs.nvidia.com/jetson/archives/r34.1/DeveloperGuide/text/HR/JetsonEepromLayout.html"""
+    """See https://docs.nvidia.com/jetson/archives/r34.1/DeveloperGuide/text/HR/JetsonEepromLayout.html
+
+    The input is one 255-byte EEPROM image, so this stays a plain
+    table loop; offloading 255 dependent-chain iterations to numpy or
+    a JIT wouldn't recoup its own setup cost, let alone justify the
+    dependency.
+    """
+    table = _CRC8_TABLE
     for c in b:
-        assert c >= 0
-        assert c < 256
-        for bit in range(8):
-            odd = ((c ^ crc) & 1) == 1
-            crc >>= 1
-            c >>= 1
-            if odd:
-                crc ^= 0x8C
+        crc = table[crc ^ c]
     return crc
 
 
+# Both filler bytes the layout uses; one rstrip over the combined set
+# covers every string field, so call sites don't each pick a strip
+# argument.  (0xFF can't appear in real data anyway-- it isn't valid
+# UTF-8, so a field carrying one would fail the decode below.)
+_EEPROM_FILLER = b"\x00\xFF"
+
+
 class EepromStr(str):
     """Some ASCII printable data is stored in eeprom with fill characters (\x00
     or \xFF); use this adapter to get a printable string without that filler.
@@ -128,7 +169,7 @@ class EepromStr(str):
     directly if we didn't want to have special yaml or html handling.
     """
 
-    def __new__(cls, b, strip=b"\x00"):
+    def __new__(cls, b, strip=_EEPROM_FILLER):
         s = b.rstrip(strip).decode("utf-8")
         obj = str.__new__(cls, s)
         obj._s = s
@@ -146,12 +187,14 @@ class EepromStr(str):
         return util.Na("Not specified").html()
 
 
-yaml.add_representer(EepromStr, lambda dumper, data: data.yaml(dumper))
+html_render.add_yaml_representer(EepromStr, lambda dumper, data: data.yaml(dumper))
 
 
 class EepromMac:
     def __init__(self, b):
-        self._s = ":".join(["%02X" % c for c in b])
+        # b is a ctypes uint8 array; bytes() gets us a real bytes
+        # object whose hex() formats the whole MAC in one C call.
+        self._s = bytes(b).hex(":").upper()
 
     def __str__(self):
         return self._s
@@ -163,22 +206,39 @@ class EepromMac:
         return self._s
 
 
-yaml.add_representer(EepromMac, lambda dumper, data: data.yaml(dumper))
+html_render.add_yaml_representer(EepromMac, lambda dumper, data: data.yaml(dumper))
 
 
 def _jetson_eeprom_information(device=0, address=0x50):
     """NOTE this returns the JetsonEeprom instance AND the computed CRC of
     EEPROM data.  You really want to use jetson_eeprom_information() instead.
     """
+    # Opening the bus per call is fine here: the cached wrapper below
+    # means this runs once per (device, address) for the process
+    # lifetime, so a module-level SMBus handle (plus the atexit and
+    # locking it would need) would never be reused.
     with smbus2.SMBus(device) as bus:
-        bs = 16
-        r = bytearray()
-        for a in range(0, 256, bs):
-            assert (a >> 8) == 0
-            wr = smbus2.i2c_msg.write(address, [a & 0xFF])
-            rd = smbus2.i2c_msg.read(address, bs)
-            bus.i2c_rdwr(wr, rd)
-            r.extend(list(rd))
+        # Prefer one address write plus a single 256-byte read: each
+        # i2c_rdwr round trip costs an ioctl and bus start/stop, so
+        # chunking sixteen ways made the transaction overhead dominate
+        # the transfer.  Adapters that cap the message size reject the
+        # big read; retry with smaller chunks before giving up.
+        for bs in (256, 64, 16):
+            r = bytearray()
+            try:
+                for a in range(0, 256, bs):
+                    assert (a >> 8) == 0
+                    wr = smbus2.i2c_msg.write(address, [a & 0xFF])
+                    rd = smbus2.i2c_msg.read(address, bs)
+                    bus.i2c_rdwr(wr, rd)
+                    # bytes(rd) hands the read buffer straight to the
+                    # bytearray via the buffer protocol; list(rd)
+                    # materialized one PyLong per byte first.
+                    r.extend(bytes(rd))
+                break
+            except OSError:
+                if bs == 16:
+                    raise
     eeprom = JetsonEepromCtypesAdapter.from_buffer(r)
     computed_crc = compute_crc8(r[:-1])
     jetson_eeprom = {
@@ -193,7 +253,7 @@ def _jetson_eeprom_information(device=0, address=0x50):
         "display_configuration": eeprom.display_configuration,
         "rework_level": eeprom.rework_level,
         "gigabit_mac_ids": eeprom.gigabit_mac_ids,
-        "board_id": EepromStr(eeprom.board_id, strip=b"\x00\xFF"),
+        "board_id": EepromStr(eeprom.board_id),
         "wifi_mac_id": EepromMac(eeprom.wifi_mac_id),
         "bluetooth_mac_id": EepromMac(eeprom.bluetooth_mac_id),
         "secondary_wifi_mac_id": EepromMac(eeprom.secondary_wifi_mac_id),
@@ -218,8 +278,8 @@ def _jetson_eeprom_information(device=0, address=0x50):
     return jetson_eeprom, computed_crc
 
 
-def jetson_eeprom_information(device=0, address=0x50):
-    """Returns a dict with the data found in the on-board IDROM."""
+@functools.lru_cache(maxsize=4)
+def _jetson_eeprom_information_cached(device, address):
     eeprom, computed_crc = _jetson_eeprom_information(device, address)
     eeprom_crc = eeprom["crc8"]
     # If the EEPROM CRC doesn't match, let the user know.
@@ -230,10 +290,20 @@ def jetson_eeprom_information(device=0, address=0x50):
     return eeprom
 
 
+def jetson_eeprom_information(device=0, address=0x50):
+    """Returns a dict with the data found in the on-board IDROM.  The
+    EEPROM contents can't change while we're running, so the I2C read
+    is cached per (device, address)-- e.g. main() asking for the model
+    and then the full dump only touches the bus once.  Callers get a
+    shallow copy so annotating the returned dict doesn't leak into the
+    cached entry."""
+    return dict(_jetson_eeprom_information_cached(device, address))
+
+
 def model():
     eeprom = jetson_eeprom_information()
     board_id = eeprom["board_id"]
-    g = re.match("699-(.)(....)-(....)-(...) (...)", board_id)
+    g = _BOARD_ID_RE.match(board_id)
     assert g is not None
     board_class, module_id, sku, version, revision = (
         g.group(1),
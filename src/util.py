@@ -17,13 +17,17 @@
 # See README.md for detailed information.
 #
 
+import array
+import ctypes
+import fcntl
 import os
 import holoscan_test_suite.html_render as html_render
 import json
 import os.path
 import re
+import socket
+import struct
 import subprocess
-import yaml
 
 
 def run_command(command, not_found_callback=None):
@@ -45,7 +49,9 @@ def run_command(command, not_found_callback=None):
         return
     if len(result.stderr) != 0:
         print('ignoring "%s"' % (result.stderr,))
-    for s in result.stdout.decode("utf-8").split("\n"):
+    # splitlines (rather than split("\n")) scans once in C, copes with
+    # CRLF, and doesn't manufacture a trailing empty entry.
+    for s in result.stdout.decode("utf-8").splitlines():
         # don't bother with blank lines.
         if len(s) == 0:
             continue
@@ -56,10 +62,15 @@ def run_command(command, not_found_callback=None):
 def fetch(*path):
     """Shorthand that makes it easy to fetch the
     contents of a file.  Typically used to fetch
-    e.g. /sys/class/net/(ethernet)/(setting)"""
-    with open(os.path.join(*path), "rt") as f:
-        v = f.read()
-    return v.strip()
+    e.g. /sys/class/net/(ethernet)/(setting).  These attributes are
+    at most a page, so a single os.read gets the whole value without
+    open()'s TextIOWrapper or the stat it does to size the read."""
+    fd = os.open(os.path.join(*path), os.O_RDONLY)
+    try:
+        v = os.read(fd, 4096)
+    finally:
+        os.close(fd)
+    return v.decode("utf-8").strip()
 
 
 class Hex(int):
@@ -79,7 +90,9 @@ class Hex(int):
         return self._format % self._i
 
 
-yaml.add_representer(Hex, lambda dumper, data: dumper.represent_int(str(data)))
+html_render.add_yaml_representer(
+    Hex, lambda dumper, data: dumper.represent_int(str(data))
+)
 
 
 class Na:
@@ -96,7 +109,9 @@ class Na:
         return "N/A: %s" % self._context
 
 
-yaml.add_representer(Na, lambda dumper, data: dumper.represent_str(str(data)))
+html_render.add_yaml_representer(
+    Na, lambda dumper, data: dumper.represent_str(str(data))
+)
 
 
 def emmc_information(path):
@@ -116,6 +131,38 @@ def emmc_information(path):
     return information
 
 
+def iter_pci_devices(vendor=None, device_class=None):
+    """Walk /sys/bus/pci/devices directly, yielding the same fields the
+    lspci-based probes parse, without forking lspci (which reads the
+    same sysfs tree anyway).  vendor is e.g. "10de" and device_class is
+    the 4-digit class/subclass e.g. "0300"; leave either as None to
+    match everything.  Bus addresses come back in the full sysfs form,
+    e.g. "0000:09:00.0"."""
+    devices_path = "/sys/bus/pci/devices"
+    try:
+        slots = sorted(os.listdir(devices_path))
+    except FileNotFoundError:
+        return
+    for slot in slots:
+        path = os.path.join(devices_path, slot)
+        device_vendor = int(fetch(path, "vendor"), 16)
+        if (vendor is not None) and (device_vendor != int(vendor, 16)):
+            continue
+        # sysfs reports the full 6-digit class (including prog-if,
+        # e.g. 0x030000); lspci-style matching only uses the top 4.
+        full_class = int(fetch(path, "class"), 16)
+        if (device_class is not None) and ((full_class >> 8) != int(device_class, 16)):
+            continue
+        device_id = int(fetch(path, "device"), 16)
+        revision = int(fetch(path, "revision"), 16)
+        yield {
+            "pci_bus_address": slot,
+            "pci_class": "%04x" % (full_class >> 8),
+            "pci_id": "%04x:%04x" % (device_vendor, device_id),
+            "pci_rev": "(rev %02x)" % revision if revision else Na("No value given"),
+        }
+
+
 def list_pci_devices(device_ids):
     # Find the devices on PCI.  pci_devices is indexed bus ID
     # (e.g. "0001:04:00.0").  device_ids is a list of "vendor:device:class"
@@ -142,10 +189,68 @@ def list_pci_devices(device_ids):
     return pci_devices
 
 
-def nvme_information(path):
+# These regular expressions collect all the data, including spaces, in the
+# line starting with e.g. "Model Number:"; but scraps spaces on either side of
+# the model number string.  Compiled once rather than per hdparm run.
+_HDPARM_MODEL_NUMBER_RE = re.compile("Model Number:[ ]+(.+?)[ ]*$", re.MULTILINE)
+_HDPARM_SERIAL_NUMBER_RE = re.compile("Serial Number:[ ]+(.+?)[ ]*$", re.MULTILINE)
+_HDPARM_FIRMWARE_REVISION_RE = re.compile(
+    "Firmware Revision:[ ]+(.+?)[ ]*$", re.MULTILINE
+)
+
+
+class _NvmeAdminCmd(ctypes.Structure):
+    # struct nvme_admin_cmd from linux/nvme_ioctl.h.
+    _fields_ = [
+        ("opcode", ctypes.c_uint8),
+        ("flags", ctypes.c_uint8),
+        ("rsvd1", ctypes.c_uint16),
+        ("nsid", ctypes.c_uint32),
+        ("cdw2", ctypes.c_uint32),
+        ("cdw3", ctypes.c_uint32),
+        ("metadata", ctypes.c_uint64),
+        ("addr", ctypes.c_uint64),
+        ("metadata_len", ctypes.c_uint32),
+        ("data_len", ctypes.c_uint32),
+        ("cdw10", ctypes.c_uint32),
+        ("cdw11", ctypes.c_uint32),
+        ("cdw12", ctypes.c_uint32),
+        ("cdw13", ctypes.c_uint32),
+        ("cdw14", ctypes.c_uint32),
+        ("cdw15", ctypes.c_uint32),
+        ("timeout_ms", ctypes.c_uint32),
+        ("result", ctypes.c_uint32),
+    ]
+
+
+_NVME_IOCTL_ADMIN_CMD = 0xC0484E41  # _IOWR('N', 0x41, struct nvme_admin_cmd)
+_NVME_ADMIN_IDENTIFY = 0x06
+_NVME_IDENTIFY_CNS_CONTROLLER = 1
+
+
+def _nvme_identify_controller(path):
+    """Issue the Identify Controller admin command directly against
+    the device and return the raw 4096-byte response.  This is the
+    same NVME_IOCTL_ADMIN_CMD the nvme tool issues, without the
+    fork+exec and JSON round trip."""
+    data = ctypes.create_string_buffer(4096)
+    cmd = _NvmeAdminCmd(
+        opcode=_NVME_ADMIN_IDENTIFY,
+        addr=ctypes.addressof(data),
+        data_len=len(data),
+        cdw10=_NVME_IDENTIFY_CNS_CONTROLLER,
+    )
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        fcntl.ioctl(fd, _NVME_IOCTL_ADMIN_CMD, cmd)
+    finally:
+        os.close(fd)
+    return data.raw
+
+
+def _nvme_information_tool(path):
     """Use the "nvme" tool to fetch information about
     this device."""
-    # TO DO: Add PCI mapping information.
     command = ["/usr/sbin/nvme", "id-ctrl", "--output-format=json", path]
     information = {"tool_status": Na("nvme tool not found")}
     try:
@@ -173,6 +278,31 @@ def nvme_information(path):
     return information
 
 
+def nvme_information(path):
+    """Fetch Identify Controller data for this device, preferring the
+    admin ioctl; fall back to the nvme tool if the ioctl fails (e.g.
+    insufficient privilege)."""
+    # TO DO: Add PCI mapping information.
+    try:
+        m = _nvme_identify_controller(path)
+    except OSError:
+        return _nvme_information_tool(path)
+    # Field offsets per the Identify Controller data structure in the
+    # NVMe spec; the same places nvme-cli's JSON values come from.
+    tnvmcap = int.from_bytes(m[280:296], "little")
+    return {
+        "path": path,
+        "vendor_oui": int.from_bytes(m[73:76], "little"),
+        "model_number": m[24:64].decode("ascii").strip(),
+        "serial_number": m[4:24].decode("ascii").strip(),
+        "firmware_revision": m[64:72].decode("ascii").strip(),
+        "pci_vendor_id": int.from_bytes(m[0:2], "little"),
+        "pci_subsystem_vendor_id": int.from_bytes(m[2:4], "little"),
+        "total_capacity_bytes": tnvmcap,
+        "total_capacity_gb": round(tnvmcap / (1024 * 1024 * 1024), 1),
+    }
+
+
 def sata_information(path):
     """Use hdparam to find information about this device (e.g. "/dev/sda")."""
     command = ["/sbin/hdparm", "-I", path]
@@ -188,20 +318,53 @@ def sata_information(path):
     data = binary_data.decode("utf-8")
 
     def match_group(rexp, group):
-        m = re.search(rexp, data, flags=re.MULTILINE)
+        m = rexp.search(data)
         return m.group(group)
 
-    # These regular expressions collect all the data, including spaces, in the
-    # line starting with e.g. "Model Number:"; but scraps spaces on either side of
-    # the model number string.
     r = {
-        "model_number": match_group("Model Number:[ ]+(.+?)[ ]*$", 1),
-        "serial_number": match_group("Serial Number:[ ]+(.+?)[ ]*$", 1),
-        "firmware_revision": match_group("Firmware Revision:[ ]+(.+?)[ ]*$", 1),
+        "model_number": match_group(_HDPARM_MODEL_NUMBER_RE, 1),
+        "serial_number": match_group(_HDPARM_SERIAL_NUMBER_RE, 1),
+        "firmware_revision": match_group(_HDPARM_FIRMWARE_REVISION_RE, 1),
     }
     return r
 
 
+# "ethtool -i" is a thin front end for the ETHTOOL_GDRVINFO ioctl;
+# asking the kernel directly saves a fork+exec per interface.
+_ETHTOOL_GDRVINFO = 0x00000003
+_SIOCETHTOOL = 0x8946
+# struct ethtool_drvinfo: __u32 cmd; then driver, version, fw_version,
+# bus_info and erom_version at 32 bytes each; 12 reserved bytes; and
+# five __u32 counts (which back the "supports-..." lines we never
+# reported anyway).
+_ETHTOOL_DRVINFO = struct.Struct("I32s32s32s32s32s12x5I")
+
+
+def ethtool_driver_information(interface):
+    """Yields the (name, value) pairs "ethtool -i <interface>" would
+    print, straight from the SIOCETHTOOL ioctl that command wraps.
+    Raises OSError for interfaces with no driver information (e.g.
+    loopback)."""
+    buf = array.array("B", bytes(_ETHTOOL_DRVINFO.size))
+    struct.pack_into("I", buf, 0, _ETHTOOL_GDRVINFO)
+    # The ifreq carries a pointer to our buffer; the kernel fills it
+    # in place.
+    address, _ = buf.buffer_info()
+    ifreq = struct.pack("16sP", interface.encode("utf-8"), address)
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        fcntl.ioctl(s.fileno(), _SIOCETHTOOL, ifreq)
+    unpacked = _ETHTOOL_DRVINFO.unpack_from(buf)
+    _, driver, version, firmware_version, bus_info, erom_version = unpacked[:6]
+    for name, value in (
+        ("driver", driver),
+        ("version", version),
+        ("firmware_version", firmware_version),
+        ("expansion_rom_version", erom_version),
+        ("bus_info", bus_info),
+    ):
+        yield name, value.split(b"\x00", 1)[0].decode("utf-8")
+
+
 def pci_network_device_information():
     pci_devices = list_pci_devices(["::0200", "::0280"])
     """Look in /sys/class/net to learn about network devices."""
@@ -219,27 +382,13 @@ def pci_network_device_information():
             "mac_address": fetch(network_path, interface, "address"),
         }
         information.update(pci_devices[slot])
-        command = ["/usr/sbin/ethtool", "-i", interface]
-        result = subprocess.run(
-            command,
-            capture_output=True,
-        )
-        if len(result.stderr) > 0:
-            # lo produces this error; don't include it at all.
-            assert b"Operation not supported" in result.stderr
+        try:
+            for name, value in ethtool_driver_information(interface):
+                information[name] = value if len(value) else Na("No value given")
+        except OSError:
+            # Interfaces without driver info (e.g. loopback) fail the
+            # ioctl with EOPNOTSUPP; don't include them at all.
             continue
-        assert result.returncode == 0
-        for binary_line in result.stdout.split(b"\n"):
-            if len(binary_line) == 0:
-                continue
-            l = binary_line.decode("utf-8")
-            name, value = l.split(": ", 1)
-            # don't clutter the report with irrelevant "supports-..." stuff
-            if name.startswith("supports-"):
-                continue
-            name = name.replace("-", "_")  # ethtool uses '-' to split up words in name
-            value = value if len(value) else Na("No value given")
-            information[name] = value
         yield information
 
 